@@ -3,19 +3,26 @@ Response caching for prompt playground
 Reduces costs and latency for repeated prompts
 """
 
-import hashlib
-import json
+import asyncio
+import heapq
+import struct
+import sys
 import time
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Awaitable, Callable, Iterable, List, Tuple
 from dataclasses import dataclass, asdict
 import logging
 
+import numpy as np
+import orjson
+import xxhash
+
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CachedResponse:
-    """Cached LLM response"""
+    """Cached LLM response (immutable; shared by every hit)"""
     prompt: str
     provider: str
     model: str
@@ -26,44 +33,344 @@ class CachedResponse:
     cost: float
     latency: float
 
+    def __post_init__(self):
+        # Thousands of entries share a handful of provider/model names
+        object.__setattr__(self, "provider", sys.intern(self.provider))
+        object.__setattr__(self, "model", sys.intern(self.model))
+
+
+# Per-entry disk budget for the shared tier (responses are length-capped).
+# SQLite page overhead counts against the limit too, hence the floor.
+_SHARED_ENTRY_BYTES = 16 * 1024
+_SHARED_MIN_BYTES = 64 * 1024 * 1024
+
+# Stale expiry-heap items tolerated beyond 2x max_size before a rebuild
+_HEAP_SLACK = 64
+
+# Fixed-width head of a cache key: prompt digest, temperature in thousandths
+_KEY_HEAD = struct.Struct("<Qq")
+
+# Translation table halving every counter byte (used to age the sketch)
+_HALVE_TABLE = bytes(i >> 1 for i in range(256))
+
+
+class FrequencySketch:
+    """
+    Count-Min Sketch of recent key popularity (TinyLFU)
+
+    Each key maps to one small counter per row; the estimate is the
+    minimum across rows. Counters saturate at 15 and are halved once
+    `sample_size` increments have been recorded, so the sketch reflects
+    recent rather than all-time popularity.
+    """
+
+    _SEEDS = (
+        0x9E3779B97F4A7C15,
+        0xC2B2AE3D27D4EB4F,
+        0x165667B19E3779F9,
+        0xD6E8FEB86659FD93,
+    )
+    _MAX_COUNT = 15
+
+    def __init__(self, capacity: int):
+        width = 16
+        while width < capacity * 4:
+            width <<= 1
+        self._mask = width - 1
+        self._rows = [bytearray(width) for _ in self._SEEDS]
+        self._sample_size = max(16, capacity * 10)
+        self._additions = 0
+
+    def _indexes(self, key: int):
+        for seed in self._SEEDS:
+            yield (((key * seed) & 0xFFFFFFFFFFFFFFFF) >> 32) & self._mask
+
+    def increment(self, key: int):
+        """Record one access of key"""
+        for row, idx in zip(self._rows, self._indexes(key)):
+            if row[idx] < self._MAX_COUNT:
+                row[idx] += 1
+
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._rows = [row.translate(_HALVE_TABLE) for row in self._rows]
+            self._additions //= 2
+
+    def frequency(self, key: int) -> int:
+        """Estimated recent access count for key"""
+        return min(row[idx] for row, idx in zip(self._rows, self._indexes(key)))
+
+    def clear(self):
+        """Reset all counters"""
+        for row in self._rows:
+            row[:] = bytes(len(row))
+        self._additions = 0
+
+
+class SemanticIndex:
+    """
+    Cosine-similarity index of cached prompt embeddings
+
+    Lets near-duplicate prompts (case, whitespace, light paraphrase) reuse a
+    cached response. Matches are only considered within the same context
+    (provider, model, temperature, system prompt), so a hit never returns
+    another model's answer. Brute-force search over a preallocated matrix
+    is fast enough at cache sizes (~1000 rows).
+    """
+
+    DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        model_name: str = DEFAULT_MODEL,
+        encode: Optional[Callable[[str], Any]] = None,
+        encode_batch: Optional[Callable[[List[str]], Any]] = None,
+    ):
+        """
+        Args:
+            threshold: Minimum cosine similarity for a hit
+            model_name: sentence-transformers model (loaded on first use)
+            encode: Optional text -> vector function replacing the model
+            encode_batch: Optional texts -> matrix function used by
+                embed_batch alongside encode (else encode runs per text)
+        """
+        self.threshold = threshold
+        self.model_name = model_name
+        self._encode = encode
+        self._encode_batch = encode_batch
+        self._vectors: Optional[np.ndarray] = None  # Row i belongs to _keys[i]
+        self._contexts: Optional[np.ndarray] = None
+        self._keys: List[int] = []
+        self._rows: Dict[int, int] = {}
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        """Lowercase and collapse whitespace"""
+        return " ".join(prompt.lower().split())
+
+    def _load_model(self):
+        """Load the sentence-transformers model on first use"""
+        # Lazy import to avoid dependency issues
+        from sentence_transformers import SentenceTransformer
+
+        logger.info(f"Loading semantic cache model {self.model_name}")
+        model = SentenceTransformer(self.model_name)
+        # model.encode takes one text or a list of them
+        self._encode = self._encode_batch = model.encode
+
+    def embed(self, prompt: str) -> np.ndarray:
+        """Unit-length embedding of the normalized prompt (CPU bound)"""
+        if self._encode is None:
+            self._load_model()
+
+        vector = np.asarray(self._encode(self.normalize(prompt)), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_batch(self, prompts: List[str]) -> np.ndarray:
+        """
+        Unit-length embeddings of several prompts, one row each (CPU bound)
+
+        The model encodes the whole list in one call; a custom encode
+        function is applied per prompt.
+        """
+        if self._encode is None:
+            self._load_model()
+
+        texts = [self.normalize(prompt) for prompt in prompts]
+        if self._encode_batch is not None:
+            vectors = np.asarray(self._encode_batch(texts), dtype=np.float32)
+        else:
+            vectors = np.asarray([self._encode(text) for text in texts], dtype=np.float32)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def search(self, vector: np.ndarray, context: int) -> Optional[int]:
+        """Key of the most similar prompt in context, if above threshold"""
+        n = len(self._keys)
+        if not n:
+            return None
+
+        scores = self._vectors[:n] @ vector
+        scores[self._contexts[:n] != context] = -1.0
+        best = int(np.argmax(scores))
+
+        if scores[best] < self.threshold:
+            return None
+        return self._keys[best]
+
+    def add(self, key: int, vector: np.ndarray, context: int):
+        """Index (or re-index) key"""
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._keys)
+            if self._vectors is None or row == len(self._vectors):
+                self._grow(len(vector))
+            self._keys.append(key)
+            self._rows[key] = row
+
+        self._vectors[row] = vector
+        self._contexts[row] = context
+
+    def discard(self, key: int):
+        """Remove key (if indexed) by moving the last row into its slot"""
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+
+        last = len(self._keys) - 1
+        last_key = self._keys.pop()
+        if row != last:
+            self._vectors[row] = self._vectors[last]
+            self._contexts[row] = self._contexts[last]
+            self._keys[row] = last_key
+            self._rows[last_key] = row
+
+    def clear(self):
+        """Drop all indexed prompts"""
+        self._keys.clear()
+        self._rows.clear()
+
+    def _grow(self, dim: int):
+        """Double the row capacity"""
+        rows = max(64, 2 * len(self._keys))
+        vectors = np.zeros((rows, dim), dtype=np.float32)
+        contexts = np.zeros(rows, dtype=np.uint64)
+        if self._vectors is not None:
+            vectors[:len(self._keys)] = self._vectors[:len(self._keys)]
+            contexts[:len(self._keys)] = self._contexts[:len(self._keys)]
+        self._vectors, self._contexts = vectors, contexts
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
 
 class ResponseCache:
     """
     In-memory cache for LLM responses
 
     Features:
-    - TTL-based expiration
+    - TTL-based expiration (min-heap of expiry times, so sweeps only touch
+      entries that actually expired)
     - LRU eviction when max size reached
+    - TinyLFU admission: a new entry only displaces the LRU victim if it
+      has been requested at least as often recently
+    - Request coalescing: concurrent misses for the same key share one
+      computation (see get_or_compute)
+    - Optional shared tier: a diskcache FanoutCache (e.g. under /dev/shm)
+      consulted on in-memory misses, so multiple uvicorn workers share
+      one warm cache
+    - Optional persistent tier: a SQLite (WAL) diskcache on real disk, so
+      the warm set survives restarts; hits are promoted into memory
+    - Tier I/O runs in worker threads on the async paths (get_async,
+      put_async, get_or_compute); a busy or failing tier reads as a miss
+      and skips the write rather than failing the request
+    - Optional semantic tier: on an exact miss, a near-duplicate prompt in
+      the same context can be served instead (see SemanticIndex)
     - Cache hit/miss metrics
     - Content-addressed storage (hash-based keys)
     """
 
-    def __init__(self, max_size: int = 1000, ttl_seconds: int = 3600):
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl_seconds: int = 3600,
+        shared_dir: Optional[str] = None,
+        semantic: Optional[SemanticIndex] = None,
+        persist_dir: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ):
         self.max_size = max_size
         self.ttl_seconds = ttl_seconds
-        self.cache: Dict[str, CachedResponse] = {}
-        self.access_times: Dict[str, float] = {}  # For LRU
+        # Wall-clock seconds: timestamps are shared across workers and restarts
+        self._clock = clock
+        self.cache: "OrderedDict[int, CachedResponse]" = OrderedDict()  # LRU order, oldest first
+        self.stores = []  # Slower tiers behind the in-memory LRU
+        # Tier failures that degrade to a miss / skipped write (see _open_*_store)
+        self._store_errors: Tuple[type, ...] = (OSError,)
+        if shared_dir:
+            self.stores.append(self._open_shared_store(shared_dir))
+        if persist_dir:
+            self.stores.append(self._open_persistent_store(persist_dir))
+        self._expiry_heap: List[Tuple[float, int]] = []  # (expires_at, key), may hold stale keys
+        self.semantic = semantic
+        self.sketch = FrequencySketch(max_size)
         self.hits = 0
         self.misses = 0
+        self.rejections = 0
+        self.coalesced = 0
+        self.store_hits = 0
+        self.semantic_hits = 0
+        self._total_cost = 0.0  # Sum of cost over in-memory entries
+        self._cost_saved = 0.0  # Sum of cost over responses served from cache
+        self._inflight: Dict[int, "asyncio.Task[CachedResponse]"] = {}
+
+    def _open_shared_store(self, directory: str):
+        """Open a cross-process FanoutCache tier"""
+        # Lazy import to avoid dependency issues
+        from diskcache import FanoutCache, Timeout
+
+        self._store_errors = (Timeout, OSError)
+        logger.info(f"Using shared response cache at {directory}")
+        return FanoutCache(
+            directory,
+            shards=8,
+            timeout=0.1,  # Treat lock contention as a miss rather than stalling
+            size_limit=max(self.max_size * _SHARED_ENTRY_BYTES, _SHARED_MIN_BYTES),
+            eviction_policy="least-recently-used",
+        )
 
-    def _make_key(
+    def _open_persistent_store(self, directory: str):
+        """Open an on-disk tier that survives restarts"""
+        # Lazy import to avoid dependency issues
+        from diskcache import Cache, Timeout
+
+        self._store_errors = (Timeout, OSError)
+        logger.info(f"Using persistent response cache at {directory}")
+        return Cache(
+            directory,
+            timeout=0.1,
+            sqlite_journal_mode="wal",
+            sqlite_synchronous=1,  # NORMAL: durable at checkpoints, no fsync per write
+            eviction_policy="least-recently-used",
+        )
+
+    @staticmethod
+    def prompt_hash(prompt: str, system_prompt: Optional[str] = None) -> int:
+        """
+        Digest of the prompt text fields of a cache key
+
+        Compute once per request and pass as prompt_hash= when looking up the
+        same prompt for several providers, so long prompts are hashed once.
+        """
+        return xxhash.xxh3_64_intdigest(b"\0".join((prompt.encode(), (system_prompt or "").encode())))
+
+    def make_key(
         self,
         prompt: str,
         provider: str,
         model: str,
         temperature: float = 0.7,
         system_prompt: Optional[str] = None,
-    ) -> str:
-        """Generate cache key from request parameters"""
-        key_data = {
-            "prompt": prompt,
-            "provider": provider,
-            "model": model,
-            "temperature": temperature,
-            "system_prompt": system_prompt or "",
-        }
-        key_json = json.dumps(key_data, sort_keys=True)
-        return hashlib.sha256(key_json.encode()).hexdigest()
+        prompt_hash: Optional[int] = None,
+    ) -> int:
+        """
+        Generate cache key from request parameters
+
+        Keys are only used for in-process lookups, so a fast non-cryptographic
+        64-bit xxh3 digest is sufficient. It covers a packed binary head (the
+        prompt digest and the temperature quantized to thousandths, so float
+        jitter like 0.7 vs 0.70000001 still hits) plus provider and model.
+        Pass the result as key= to get/put/get_or_compute to reuse it.
+        """
+        if prompt_hash is None:
+            prompt_hash = self.prompt_hash(prompt, system_prompt)
+
+        head = _KEY_HEAD.pack(prompt_hash, round(temperature * 1000))
+        return xxhash.xxh3_64_intdigest(head + f"{provider}\0{model}".encode())
 
     def get(
         self,
@@ -72,34 +379,160 @@ class ResponseCache:
         model: str,
         temperature: float = 0.7,
         system_prompt: Optional[str] = None,
+        prompt_hash: Optional[int] = None,
+        key: Optional[int] = None,
     ) -> Optional[CachedResponse]:
         """
         Get cached response if available and not expired
 
         Returns None if not found or expired
         """
-        key = self._make_key(prompt, provider, model, temperature, system_prompt)
+        if key is None:
+            key = self.make_key(prompt, provider, model, temperature, system_prompt, prompt_hash)
+        cached = self._lookup(key, count_miss=self.semantic is None)
 
-        if key not in self.cache:
-            self.misses += 1
+        if cached is None and self.semantic is not None:
+            context = self.make_key("", provider, model, temperature, system_prompt)
+            cached = self._lookup_similar(self.semantic.embed(prompt), context)
+
+        return cached
+
+    async def get_async(
+        self,
+        prompt: str,
+        provider: str,
+        model: str,
+        temperature: float = 0.7,
+        system_prompt: Optional[str] = None,
+        prompt_hash: Optional[int] = None,
+        key: Optional[int] = None,
+    ) -> Optional[CachedResponse]:
+        """
+        get() for use on the event loop
+
+        Slower-tier reads and the semantic embedding run in a worker thread
+        instead of blocking the loop.
+        """
+        if key is None:
+            key = self.make_key(prompt, provider, model, temperature, system_prompt, prompt_hash)
+        cached = await self._lookup_async(key, count_miss=self.semantic is None)
+
+        if cached is None and self.semantic is not None:
+            vector = await asyncio.to_thread(self.semantic.embed, prompt)
+            context = self.make_key("", provider, model, temperature, system_prompt)
+            cached = self._lookup_similar(vector, context)
+
+        return cached
+
+    def _lookup(self, key: int, count_miss: bool = True) -> Optional[CachedResponse]:
+        """Look up a key in memory, then the slower tiers, counting the outcome"""
+        cached = self._lookup_memory(key)
+        if cached is None and self.stores:
+            cached = self._promote(key, self._read_stores(key))
+        return self._count(cached, count_miss)
+
+    async def _lookup_async(self, key: int, count_miss: bool = True) -> Optional[CachedResponse]:
+        """_lookup with the slower-tier read in a worker thread"""
+        cached = self._lookup_memory(key)
+        if cached is None and self.stores:
+            cached = self._promote(key, await asyncio.to_thread(self._read_stores, key))
+        return self._count(cached, count_miss)
+
+    def _lookup_memory(self, key: int) -> Optional[CachedResponse]:
+        """In-memory part of a lookup: records popularity, expiry and LRU order"""
+        self.sketch.increment(key)
+
+        cached = self.cache.get(key)
+        if cached is None:
             return None
 
-        cached = self.cache[key]
-        age = time.time() - cached.timestamp
+        age = self._clock() - cached.timestamp
 
         # Check if expired
         if age > self.ttl_seconds:
-            logger.debug(f"Cache expired for key {key[:8]}... (age={age:.0f}s)")
-            del self.cache[key]
-            del self.access_times[key]
+            logger.debug("Cache expired for key %016x (age=%.0fs)", key, age)
+            self._discard(key)
+            return None
+
+        # Mark as most recently used
+        self.cache.move_to_end(key)
+        logger.info("Cache hit for %s/%s (age=%.0fs)", cached.provider, cached.model, age)
+        return cached
+
+    def _count(self, cached: Optional[CachedResponse], count_miss: bool = True) -> Optional[CachedResponse]:
+        """Record a lookup's outcome in the hit/miss counters"""
+        if cached is not None:
+            self.hits += 1
+            self._cost_saved += cached.cost
+        elif count_miss:
             self.misses += 1
+        return cached
+
+    def _lookup_similar(
+        self, vector: np.ndarray, context: int, count_miss: bool = True
+    ) -> Optional[CachedResponse]:
+        """Semantic fallback after an exact miss (counts the miss if none found)"""
+        key = self.semantic.search(vector, context)
+        cached = self.cache.get(key) if key is not None else None
+
+        if cached is None or self._clock() - cached.timestamp > self.ttl_seconds:
+            if count_miss:
+                self.misses += 1
             return None
 
-        # Update access time for LRU
-        self.access_times[key] = time.time()
+        self.cache.move_to_end(key)
         self.hits += 1
+        self.semantic_hits += 1
+        self._cost_saved += cached.cost
+        logger.info("Semantic cache hit for %s/%s", cached.provider, cached.model)
+        return cached
+
+    def _index_similar(self, key: int, vector: np.ndarray, context: int):
+        """Add an admitted entry to the semantic index"""
+        if key in self.cache:
+            self.semantic.add(key, vector, context)
+
+    def _read_stores(self, key: int) -> Optional[CachedResponse]:
+        """
+        First live entry for key in the slower tiers (blocking I/O)
+
+        A busy or failing tier is treated as a miss.
+        """
+        for store in self.stores:
+            try:
+                blob = store.get(key)
+            except self._store_errors as e:
+                logger.warning(f"Cache tier read failed, treating as miss: {e!r}")
+                continue
+            if blob is None:
+                continue
+
+            cached = CachedResponse(**orjson.loads(blob))
+            if self._clock() - cached.timestamp > self.ttl_seconds:
+                continue
+            return cached
+
+        return None
+
+    def _write_stores(self, key: int, cached_response: CachedResponse):
+        """
+        Write an entry through to the slower tiers (blocking I/O)
 
-        logger.info(f"Cache hit for {provider}/{model} (age={age:.0f}s)")
+        A busy or failing tier skips the write; the entry is still in memory.
+        """
+        blob = orjson.dumps(asdict(cached_response))
+        for store in self.stores:
+            try:
+                store.set(key, blob, expire=self.ttl_seconds)
+            except self._store_errors as e:
+                logger.warning(f"Cache tier write failed, skipping: {e!r}")
+
+    def _promote(self, key: int, cached: Optional[CachedResponse]) -> Optional[CachedResponse]:
+        """Insert a live slower-tier entry into memory"""
+        if cached is not None:
+            self.store_hits += 1
+            self._insert(key, cached)
+            logger.info("Cache hit for %s/%s (shared tier)", cached.provider, cached.model)
         return cached
 
     def put(
@@ -114,81 +547,357 @@ class ResponseCache:
         latency: float,
         temperature: float = 0.7,
         system_prompt: Optional[str] = None,
+        prompt_hash: Optional[int] = None,
+        key: Optional[int] = None,
     ):
         """Add response to cache"""
-        key = self._make_key(prompt, provider, model, temperature, system_prompt)
+        if key is None:
+            key = self.make_key(prompt, provider, model, temperature, system_prompt, prompt_hash)
+
+        cached_response = CachedResponse(
+            prompt=prompt,
+            provider=provider,
+            model=model,
+            response=response,
+            timestamp=self._clock(),
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cost=cost,
+            latency=latency,
+        )
+        self._store(key, cached_response)
+
+        if self.semantic is not None:
+            context = self.make_key("", provider, model, temperature, system_prompt)
+            self._index_similar(key, self.semantic.embed(prompt), context)
+
+    async def put_async(
+        self,
+        prompt: str,
+        provider: str,
+        model: str,
+        response: str,
+        input_tokens: int,
+        output_tokens: int,
+        cost: float,
+        latency: float,
+        temperature: float = 0.7,
+        system_prompt: Optional[str] = None,
+        prompt_hash: Optional[int] = None,
+        key: Optional[int] = None,
+    ):
+        """
+        put() for use on the event loop
 
-        # Evict oldest if at capacity
-        if len(self.cache) >= self.max_size:
-            self._evict_lru()
+        The entry is in memory before the first await; the write-through to
+        slower tiers and the semantic embedding run in a worker thread.
+        """
+        if key is None:
+            key = self.make_key(prompt, provider, model, temperature, system_prompt, prompt_hash)
 
         cached_response = CachedResponse(
             prompt=prompt,
             provider=provider,
             model=model,
             response=response,
-            timestamp=time.time(),
+            timestamp=self._clock(),
             input_tokens=input_tokens,
             output_tokens=output_tokens,
             cost=cost,
             latency=latency,
         )
+        await self._store_async(key, cached_response)
 
-        self.cache[key] = cached_response
-        self.access_times[key] = time.time()
+        if self.semantic is not None:
+            vector = await asyncio.to_thread(self.semantic.embed, prompt)
+            context = self.make_key("", provider, model, temperature, system_prompt)
+            self._index_similar(key, vector, context)
 
-        logger.debug(f"Cached response for {provider}/{model} (cache_size={len(self.cache)})")
+    def bulk_put(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add many responses at once (e.g. warming from a persisted dump)
 
-    def _evict_lru(self):
-        """Evict least recently used entry"""
-        if not self.access_times:
-            return
+        Keys are hashed in one pass up front, shared-tier writes happen in a
+        single transaction per store instead of one commit per entry, and
+        admitted prompts are embedded in one batch.
 
-        # Find oldest access
-        lru_key = min(self.access_times.keys(), key=lambda k: self.access_times[k])
+        Args:
+            entries: Dicts of put() keyword arguments, optionally with a
+                "timestamp" to preserve the original age (expired ones are
+                skipped, as are malformed ones, with a warning)
 
-        logger.debug(f"Evicting LRU entry {lru_key[:8]}...")
-        del self.cache[lru_key]
-        del self.access_times[lru_key]
+        Returns:
+            Number of entries admitted into memory
+        """
+        make_key = self.make_key
+        now = self._clock()
+
+        batch = []
+        for entry in entries:
+            entry = dict(entry)
+            temperature = entry.pop("temperature", 0.7)
+            system_prompt = entry.pop("system_prompt", None)
+            prompt_hash = entry.pop("prompt_hash", None)
+            key = entry.pop("key", None)
+            entry.setdefault("timestamp", now)
+            try:
+                cached_response = CachedResponse(**entry)
+            except TypeError as e:
+                logger.warning(f"Skipping malformed bulk cache entry: {e}")
+                continue
+            if now - cached_response.timestamp > self.ttl_seconds:
+                continue  # Already expired
+            if key is None:
+                key = make_key(
+                    cached_response.prompt, cached_response.provider, cached_response.model,
+                    temperature, system_prompt, prompt_hash,
+                )
+            batch.append((key, cached_response, temperature, system_prompt))
+
+        for store in self.stores:
+            try:
+                with store.transact(retry=True):
+                    for key, cached_response, _, _ in batch:
+                        remaining = cached_response.timestamp + self.ttl_seconds - now
+                        store.set(key, orjson.dumps(asdict(cached_response)), expire=remaining)
+            except self._store_errors as e:
+                logger.warning(f"Cache tier bulk write failed, skipping: {e!r}")
+
+        for key, cached_response, _, _ in batch:
+            self._insert(key, cached_response)
+
+        if self.semantic is not None:
+            # One encode call for every admitted prompt
+            indexed = [item for item in batch if item[0] in self.cache]
+            if indexed:
+                vectors = self.semantic.embed_batch([item[1].prompt for item in indexed])
+                for (key, cached_response, temperature, system_prompt), vector in zip(indexed, vectors):
+                    context = make_key("", cached_response.provider, cached_response.model, temperature, system_prompt)
+                    self._index_similar(key, vector, context)
+
+        admitted = sum(key in self.cache for key, _, _, _ in batch)
+        logger.info(f"Bulk cached {admitted}/{len(batch)} responses")
+        return admitted
+
+    def _store(self, key: int, cached_response: CachedResponse):
+        """Insert an entry into every tier, applying admission and LRU eviction"""
+        if self.stores:
+            self._write_stores(key, cached_response)
+
+        self._insert(key, cached_response)
+
+    async def _store_async(self, key: int, cached_response: CachedResponse):
+        """_store with the write-through in a worker thread (memory is updated first)"""
+        self._insert(key, cached_response)
+        if self.stores:
+            await asyncio.to_thread(self._write_stores, key, cached_response)
+
+    def _insert(self, key: int, cached_response: CachedResponse):
+        """Insert an entry into the in-memory LRU"""
+        provider, model = cached_response.provider, cached_response.model
+
+        # TinyLFU admission: keep the LRU victim if it is hotter than the newcomer
+        if key not in self.cache and len(self.cache) >= self.max_size:
+            victim = next(iter(self.cache))
+            if self.sketch.frequency(key) < self.sketch.frequency(victim):
+                self.rejections += 1
+                logger.debug("Rejected admission for %s/%s (victim is hotter)", provider, model)
+                return
+
+        self._discard(key)
+        self.cache[key] = cached_response
+        self._total_cost += cached_response.cost
+        heapq.heappush(self._expiry_heap, (cached_response.timestamp + self.ttl_seconds, key))
+
+        # Evict least recently used if over capacity
+        if len(self.cache) > self.max_size:
+            lru_key = next(iter(self.cache))
+            self._discard(lru_key)
+            logger.debug("Evicting LRU entry %016x", lru_key)
+
+        # Evicted and re-put keys leave stale heap items until they expire
+        if len(self._expiry_heap) > 2 * self.max_size + _HEAP_SLACK:
+            self._rebuild_expiry_heap()
+
+        logger.debug("Cached response for %s/%s (cache_size=%d)", provider, model, len(self.cache))
+
+    def _rebuild_expiry_heap(self):
+        """Rebuild the expiry heap from live entries, dropping stale items"""
+        ttl = self.ttl_seconds
+        heap = [(cached.timestamp + ttl, key) for key, cached in self.cache.items()]
+        heapq.heapify(heap)
+        self._expiry_heap = heap
+
+    def _discard(self, key: int):
+        """Remove an in-memory entry (if present), keeping the cost total in sync"""
+        cached = self.cache.pop(key, None)
+        if cached is not None:
+            self._total_cost -= cached.cost
+            if self.semantic is not None:
+                self.semantic.discard(key)
+
+    async def get_or_compute(
+        self,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        prompt: str,
+        provider: str,
+        model: str,
+        temperature: float = 0.7,
+        system_prompt: Optional[str] = None,
+        prompt_hash: Optional[int] = None,
+        key: Optional[int] = None,
+    ) -> Tuple[CachedResponse, bool]:
+        """
+        Get cached response, computing and caching it on a miss
+
+        Concurrent callers that miss on the same key share a single
+        in-flight computation (singleflight), so N identical prompts
+        arriving together cost one LLM call instead of N.
+
+        Args:
+            compute: Coroutine function returning the remaining put() fields
+                (response, input_tokens, output_tokens, cost, latency)
+            prompt, provider, model, temperature, system_prompt: Cache key fields
+            prompt_hash: Optional precomputed prompt_hash(prompt, system_prompt)
+            key: Optional precomputed make_key(...) of the fields above
+
+        Returns:
+            Tuple of (response, cached); cached is False only for the caller
+            whose request actually ran compute, which is also the only one
+            counted as a miss
+        """
+        if key is None:
+            key = self.make_key(prompt, provider, model, temperature, system_prompt, prompt_hash)
+
+        # The miss is only counted once we know this caller has to compute
+        cached = await self._lookup_async(key, count_miss=False)
+        if cached:
+            return cached, True
+
+        vector = context = None
+        if self.semantic is not None:
+            # Embedding is CPU bound; keep it off the event loop
+            vector = await asyncio.to_thread(self.semantic.embed, prompt)
+            context = self.make_key("", provider, model, temperature, system_prompt)
+            cached = self._lookup_similar(vector, context, count_miss=False)
+            if cached:
+                return cached, True
+
+        task = self._inflight.get(key)
+        if task is not None:
+            # Served without an LLM call of its own: a hit (and coalesced)
+            self.coalesced += 1
+            logger.info("Coalescing in-flight request for %s/%s", provider, model)
+            return self._count(await asyncio.shield(task)), True
+
+        self.misses += 1
+
+        async def run() -> CachedResponse:
+            fields = await compute()
+            cached_response = CachedResponse(
+                prompt=prompt,
+                provider=provider,
+                model=model,
+                timestamp=self._clock(),
+                **fields,
+            )
+            await self._store_async(key, cached_response)
+            if vector is not None:
+                self._index_similar(key, vector, context)
+            return cached_response
+
+        # Run as its own task so a cancelled leader doesn't fail the followers
+        task = asyncio.ensure_future(run())
+        self._inflight[key] = task
+
+        def _done(finished: "asyncio.Task[CachedResponse]"):
+            self._inflight.pop(key, None)
+            if not finished.cancelled():
+                finished.exception()  # Mark retrieved even if nobody awaits it
+
+        task.add_done_callback(_done)
+        return await asyncio.shield(task), False
+
+    @property
+    def size(self) -> int:
+        """Number of entries held in memory"""
+        return len(self.cache)
 
     def clear(self):
         """Clear all cache entries"""
-        self.cache.clear()
-        self.access_times.clear()
+        self._clear_memory()
+        self._clear_stores()
         logger.info("Cache cleared")
 
+    async def clear_async(self):
+        """clear() for use on the event loop (tier clears run in a worker thread)"""
+        self._clear_memory()
+        if self.stores:
+            await asyncio.to_thread(self._clear_stores)
+        logger.info("Cache cleared")
+
+    def _clear_memory(self):
+        """Drop the in-memory entries, index and admission counts"""
+        self.cache.clear()
+        self._expiry_heap.clear()
+        self._total_cost = 0.0
+        if self.semantic is not None:
+            self.semantic.clear()
+        self.sketch.clear()
+
+    def _clear_stores(self):
+        """Clear the slower tiers (blocking I/O); a busy tier is left as is"""
+        for store in self.stores:
+            try:
+                store.clear()
+            except self._store_errors as e:
+                logger.warning(f"Cache tier clear failed, skipping: {e!r}")
+
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
         total_requests = self.hits + self.misses
         hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
 
-        # Calculate cost savings
-        total_cost_saved = sum(c.cost for c in self.cache.values()) * self.hits
-
         return {
-            "size": len(self.cache),
+            "size": self.size,
             "max_size": self.max_size,
             "hits": self.hits,
             "misses": self.misses,
             "hit_rate": hit_rate,
+            "admission_rejections": self.rejections,
+            "coalesced_requests": self.coalesced,
+            "store_hits": self.store_hits,
+            "semantic_hits": self.semantic_hits,
             "ttl_seconds": self.ttl_seconds,
-            "estimated_cost_saved": total_cost_saved,
+            "cached_cost": self._total_cost,
+            "estimated_cost_saved": self._cost_saved,
         }
 
     def cleanup_expired(self):
-        """Remove expired entries"""
-        now = time.time()
-        expired_keys = [
-            key for key, cached in self.cache.items()
-            if now - cached.timestamp > self.ttl_seconds
-        ]
-
-        for key in expired_keys:
-            del self.cache[key]
-            if key in self.access_times:
-                del self.access_times[key]
-
-        if expired_keys:
-            logger.info(f"Cleaned up {len(expired_keys)} expired entries")
-
-        return len(expired_keys)
+        """
+        Remove expired entries
+
+        Pops the expiry heap only while its head is past due. Heap items whose
+        key was evicted or re-inserted since are stale and simply dropped.
+        """
+        now = self._clock()
+        heap = self._expiry_heap
+        removed = 0
+
+        while heap and heap[0][0] < now:
+            _, key = heapq.heappop(heap)
+            cached = self.cache.get(key)
+            if cached is not None and now - cached.timestamp > self.ttl_seconds:
+                self._discard(key)
+                removed += 1
+
+        for store in self.stores:
+            try:
+                store.expire()
+            except self._store_errors as e:
+                logger.warning(f"Cache tier expiry sweep failed, skipping: {e!r}")
+
+        if removed:
+            logger.info(f"Cleaned up {removed} expired entries")
+
+        return removed
@@ -3,12 +3,20 @@ Configuration management for LLM Safety Playground
 """
 
 import os
+from functools import cached_property, lru_cache
 from typing import List
-from pydantic_settings import BaseSettings
+from pydantic import AliasChoices, Field, computed_field
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
-    """Application settings"""
+    """Application settings (frozen, so one instance is safely shared)"""
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=False,
+        frozen=True,
+    )
 
     # Application
     app_name: str = "LLM Safety Playground"
@@ -22,6 +30,10 @@ class Settings(BaseSettings):
     # Server
     host: str = "0.0.0.0"
     port: int = 8000
+    # WORKERS, or WEB_CONCURRENCY as read by uvicorn/gunicorn; >1 needs
+    # CACHE_SHARED_DIR to avoid per-worker caches
+    workers: int = Field(1, validation_alias=AliasChoices("WORKERS", "WEB_CONCURRENCY"))
+    keepalive_timeout: int = 5  # seconds; keep above any proxy's idle timeout
 
     # CORS
     cors_origins: str = "http://localhost:3000,http://localhost:5173"
@@ -39,19 +51,35 @@ class Settings(BaseSettings):
     rate_limit_enabled: bool = True
     rate_limit_requests: int = 100
     rate_limit_window: int = 60  # seconds
+    rate_limit_strategy: str = "moving-window"  # No 2x burst at window edges
+    rate_limit_storage_uri: str = "memory://"  # e.g. redis://host:6379 across workers
+
+    # Response cache
+    cache_shared_dir: str = ""  # e.g. /dev/shm/llm_cache to share across workers
+    cache_persist_dir: str = ""  # e.g. ./data/llm_cache to survive restarts
+    cache_semantic_enabled: bool = False  # Needs sentence-transformers
+    cache_semantic_threshold: float = 0.95  # Min cosine similarity for a hit
+
+    # Prompt optimizer
+    token_estimation_mode: str = "tiktoken"  # or "heuristic" (~4 chars/token, no tokenizer)
+    optimize_batch_max: int = 100  # Max prompts per /api/optimize/batch request
 
     # Timeouts
     llm_timeout: int = 30  # seconds
+    llm_max_connections: int = 50  # Per provider HTTP pool
+    llm_max_keepalive_connections: int = 20
     max_prompt_length: int = 4000
     max_response_length: int = 8000
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+    @computed_field
+    @cached_property
+    def cors_origins_list(self) -> List[str]:
+        """CORS origins parsed from the comma-separated string (once)"""
+        return [origin.strip() for origin in self.cors_origins.split(",")]
 
     def get_cors_origins(self) -> List[str]:
         """Parse CORS origins from comma-separated string"""
-        return [origin.strip() for origin in self.cors_origins.split(",")]
+        return self.cors_origins_list
 
     def is_production(self) -> bool:
         """Check if running in production"""
@@ -62,5 +90,11 @@ class Settings(BaseSettings):
         return self.environment.lower() == "development"
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings once (usable as a FastAPI dependency)"""
+    return Settings()
+
+
 # Global settings instance
-settings = Settings()
+settings = get_settings()
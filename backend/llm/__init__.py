@@ -1,3 +1,3 @@
-from .providers import LLMProvider, OpenAIProvider, AnthropicProvider, create_provider
+from .providers import LLMProvider, OpenAIProvider, AnthropicProvider, create_provider, get_provider, SUPPORTED_PROVIDERS
 
-__all__ = ["LLMProvider", "OpenAIProvider", "AnthropicProvider", "create_provider"]
+__all__ = ["LLMProvider", "OpenAIProvider", "AnthropicProvider", "create_provider", "get_provider", "SUPPORTED_PROVIDERS"]
@@ -3,19 +3,82 @@ LLM provider wrappers
 Supports OpenAI and Anthropic APIs
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator
 from abc import ABC, abstractmethod
+from functools import lru_cache
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
+# Shared HTTP clients by provider name (see get_http_client)
+_http_clients: Dict[str, Any] = {}
+
+
+def get_http_client(provider_name: str):
+    """
+    Shared async HTTP client for a provider's SDK
+
+    One pooled client per provider is reused by every provider instance,
+    so connections (HTTP/2 when h2 is installed) stay warm across requests.
+
+    Args:
+        provider_name: Provider the client is for
+
+    Returns:
+        httpx.AsyncClient
+    """
+    client = _http_clients.get(provider_name)
+    if client is not None:
+        return client
+
+    # Lazy import to avoid dependency issues
+    import httpx
+    from config import settings
+
+    limits = httpx.Limits(
+        max_connections=settings.llm_max_connections,
+        max_keepalive_connections=settings.llm_max_keepalive_connections,
+    )
+    timeout = httpx.Timeout(settings.llm_timeout)
+
+    try:
+        client = httpx.AsyncClient(http2=True, limits=limits, timeout=timeout)
+    except ImportError:
+        logger.warning(f"h2 not installed, {provider_name} client falls back to HTTP/1.1")
+        client = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+    _http_clients[provider_name] = client
+    return client
+
+
+async def close_http_clients():
+    """Close all shared HTTP clients (call on application shutdown)"""
+    while _http_clients:
+        _, client = _http_clients.popitem()
+        await client.aclose()
+
+    # Cached providers hold the closed clients; the next lifespan builds fresh ones
+    get_provider.cache_clear()
+
 
 class LLMProvider(ABC):
     """Base class for LLM providers"""
 
     @abstractmethod
-    def generate(self, prompt: str, **kwargs) -> str:
+    async def generate(self, prompt: str, **kwargs) -> str:
         """Generate response from LLM"""
         pass
 
+    async def generate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """
+        Generate response from LLM as incremental text chunks
+
+        Default implementation yields the full generate() result at once;
+        providers with a streaming API override this.
+        """
+        yield await self.generate(prompt, **kwargs)
+
     @abstractmethod
     def get_model_name(self) -> str:
         """Get model name"""
@@ -50,10 +113,10 @@ class OpenAIProvider(LLMProvider):
         self.max_tokens = max_tokens
 
         # Lazy import to avoid dependency issues
-        from openai import OpenAI
-        self.client = OpenAI(api_key=self.api_key)
+        from openai import AsyncOpenAI
+        self.client = AsyncOpenAI(api_key=self.api_key, http_client=get_http_client("openai"))
 
-    def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
         """
         Generate response from OpenAI
 
@@ -72,7 +135,7 @@ class OpenAIProvider(LLMProvider):
 
         messages.append({"role": "user", "content": prompt})
 
-        response = self.client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model=kwargs.get("model", self.model),
             messages=messages,
             temperature=kwargs.get("temperature", self.temperature),
@@ -81,6 +144,39 @@ class OpenAIProvider(LLMProvider):
 
         return response.choices[0].message.content
 
+    async def generate_stream(
+        self, prompt: str, system_prompt: Optional[str] = None, **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Stream response from OpenAI
+
+        Args:
+            prompt: User prompt
+            system_prompt: Optional system prompt
+            **kwargs: Additional arguments passed to API
+
+        Yields:
+            Text deltas as they arrive
+        """
+        messages = []
+
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+
+        messages.append({"role": "user", "content": prompt})
+
+        stream = await self.client.chat.completions.create(
+            model=kwargs.get("model", self.model),
+            messages=messages,
+            temperature=kwargs.get("temperature", self.temperature),
+            max_tokens=kwargs.get("max_tokens", self.max_tokens),
+            stream=True,
+        )
+
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
     def get_model_name(self) -> str:
         """Get model name"""
         return self.model
@@ -114,10 +210,10 @@ class AnthropicProvider(LLMProvider):
         self.max_tokens = max_tokens
 
         # Lazy import to avoid dependency issues
-        from anthropic import Anthropic
-        self.client = Anthropic(api_key=self.api_key)
+        from anthropic import AsyncAnthropic
+        self.client = AsyncAnthropic(api_key=self.api_key, http_client=get_http_client("anthropic"))
 
-    def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
+    async def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
         """
         Generate response from Anthropic
 
@@ -139,15 +235,47 @@ class AnthropicProvider(LLMProvider):
         if system_prompt:
             message_params["system"] = system_prompt
 
-        response = self.client.messages.create(**message_params)
+        response = await self.client.messages.create(**message_params)
 
         return response.content[0].text
 
+    async def generate_stream(
+        self, prompt: str, system_prompt: Optional[str] = None, **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Stream response from Anthropic
+
+        Args:
+            prompt: User prompt
+            system_prompt: Optional system prompt
+            **kwargs: Additional arguments passed to API
+
+        Yields:
+            Text deltas as they arrive
+        """
+        message_params = {
+            "model": kwargs.get("model", self.model),
+            "max_tokens": kwargs.get("max_tokens", self.max_tokens),
+            "temperature": kwargs.get("temperature", self.temperature),
+            "messages": [{"role": "user", "content": prompt}],
+        }
+
+        if system_prompt:
+            message_params["system"] = system_prompt
+
+        async with self.client.messages.stream(**message_params) as stream:
+            async for text in stream.text_stream:
+                yield text
+
     def get_model_name(self) -> str:
         """Get model name"""
         return self.model
 
 
+# Provider names accepted by create_provider
+SUPPORTED_PROVIDERS = ("openai", "anthropic")
+
+
 def create_provider(
     provider_name: str,
     api_key: Optional[str] = None,
@@ -187,3 +315,21 @@ def create_provider(
 
     else:
         raise ValueError(f"Unsupported provider: {provider_name}. Use 'openai' or 'anthropic'")
+
+
+@lru_cache(maxsize=len(SUPPORTED_PROVIDERS))
+def get_provider(provider_name: str) -> LLMProvider:
+    """
+    Get the shared LLM provider instance for a provider
+
+    One instance per provider serves every request, so the SDK client is
+    built once. Per-request settings (model, temperature, max_tokens)
+    are passed to generate() / generate_stream() instead.
+
+    Args:
+        provider_name: "openai" or "anthropic"
+
+    Returns:
+        Cached LLMProvider instance (with the provider's default model)
+    """
+    return create_provider(provider_name)
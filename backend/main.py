@@ -3,28 +3,47 @@ FastAPI backend for Prompt Playground
 Compare prompts across multiple LLM providers
 """
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from typing import Optional, List, Dict
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List, Dict, Tuple
+import asyncio
+import hashlib
 import os
+from contextlib import asynccontextmanager
+from functools import lru_cache
 import logging
 import time
 from pathlib import Path
 from dotenv import load_dotenv
+import orjson
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
 from config import settings
 from middleware import RequestLoggingMiddleware, SecurityHeadersMiddleware, limiter
 from metrics import metrics
-from llm.providers import create_provider
-from prompts.templates import TEMPLATES, get_template, render_template, get_all_categories
-from prompts.cost import calculate_cost, get_cost_breakdown, estimate_tokens
+from llm.providers import get_provider, close_http_clients, SUPPORTED_PROVIDERS
+from prompts.templates import (
+    TEMPLATES,
+    TEMPLATES_BY_CATEGORY,
+    get_template,
+    render_template,
+    get_all_categories,
+)
+from prompts.cost import (
+    PRICING,
+    calculate_cost,
+    get_cost_breakdown,
+    estimate_tokens,
+    estimate_tokens_batch,
+    tokenizer_key,
+    warm_encodings,
+)
 from prompts.optimizer import PromptOptimizer, OptimizationResult
-from cache import ResponseCache
+from cache import ResponseCache, SemanticIndex
+from static_files import CachedStaticFiles
 
 # Load environment variables
 load_dotenv()
@@ -37,11 +56,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown"""
+    # Load tokenizers off the event loop before taking traffic
+    loaded = await asyncio.to_thread(warm_encodings)
+    logger.info(f"Warmed {loaded} tiktoken encodings")
+
+    yield
+    # Release pooled provider connections
+    await close_http_clients()
+
+
 # Initialize FastAPI
 app = FastAPI(
     title="Prompt Playground",
     description="Side-by-side LLM prompt comparison tool",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Add rate limiting
@@ -66,8 +99,17 @@ app.add_middleware(
 )
 
 # Initialize response cache and optimizer
-response_cache = ResponseCache(max_size=1000, ttl_seconds=3600)
-prompt_optimizer = PromptOptimizer()
+response_cache = ResponseCache(
+    max_size=1000,
+    ttl_seconds=3600,
+    shared_dir=settings.cache_shared_dir or None,
+    persist_dir=settings.cache_persist_dir or None,
+    semantic=(
+        SemanticIndex(threshold=settings.cache_semantic_threshold)
+        if settings.cache_semantic_enabled else None
+    ),
+)
+prompt_optimizer = PromptOptimizer(estimation_mode=settings.token_estimation_mode)
 
 
 # Request/Response Models
@@ -81,6 +123,19 @@ class CompareRequest(BaseModel):
     max_tokens: int = 1000
     system_prompt: Optional[str] = None
 
+    @field_validator("models")
+    @classmethod
+    def _lowercase_model_keys(cls, models: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        """Key models by lowercased provider, matching how providers are resolved"""
+        if models is None:
+            return None
+        return {provider.lower(): model for provider, model in models.items()}
+
+
+class StreamableCompareRequest(CompareRequest):
+    """/api/compare request; stream=true answers with result events only"""
+    stream: bool = False
+
 
 class ProviderResponse(BaseModel):
     """Response from a single provider"""
@@ -126,6 +181,13 @@ class OptimizeRequest(BaseModel):
     target_output_length: int = 500
 
 
+class OptimizeBatchRequest(BaseModel):
+    """Request to optimize several prompts for one model"""
+    prompts: List[str] = Field(min_length=1, max_length=settings.optimize_batch_max)
+    model: str = "gpt-4"
+    target_output_length: int = 500
+
+
 class OptimizationIssueResponse(BaseModel):
     """An optimization issue"""
     type: str
@@ -144,6 +206,11 @@ class OptimizeResponse(BaseModel):
     optimized_prompt: Optional[str] = None
 
 
+class OptimizeBatchResponse(BaseModel):
+    """Optimization results, one per prompt in request order"""
+    results: List[OptimizeResponse]
+
+
 # Endpoints
 
 @app.get("/api/")
@@ -170,15 +237,17 @@ async def health():
 @app.get("/metrics")
 async def get_metrics():
     """Get application metrics"""
-    return metrics.get_summary()
+    summary = metrics.get_summary()
+    summary["optimizer_cache"] = prompt_optimizer.get_cache_stats()
+    return summary
 
 
-@app.get("/api/templates")
-async def get_templates():
-    """Get all available templates"""
-    metrics.increment_request("templates")
+# Template library and pricing table are static, so their listings are serialized once
 
-    return [
+@lru_cache(maxsize=1)
+def _templates_body() -> bytes:
+    """Encoded /api/templates payload"""
+    return orjson.dumps([
         {
             "id": t.id,
             "name": t.name,
@@ -188,23 +257,82 @@ async def get_templates():
             "example_values": t.example_values,
         }
         for t in TEMPLATES.values()
-    ]
+    ])
 
 
-@app.get("/api/templates/category/{category}")
-async def get_templates_by_category(category: str):
-    """Get templates by category"""
-    templates = [t for t in TEMPLATES.values() if t.category == category]
+@lru_cache(maxsize=1)
+def _category_bodies() -> Dict[str, bytes]:
+    """Encoded /api/templates/category/{category} payloads by category"""
+    return {
+        category: orjson.dumps([
+            {
+                "id": t.id,
+                "name": t.name,
+                "description": t.description,
+                "variables": t.variables,
+            }
+            for t in templates
+        ])
+        for category, templates in TEMPLATES_BY_CATEGORY.items()
+    }
 
-    return [
-        {
-            "id": t.id,
-            "name": t.name,
-            "description": t.description,
-            "variables": t.variables,
+
+@lru_cache(maxsize=1)
+def _categories_body() -> bytes:
+    """Encoded /api/categories payload"""
+    return orjson.dumps(get_all_categories())
+
+
+@lru_cache(maxsize=1)
+def _pricing_body() -> bytes:
+    """Encoded /api/pricing payload"""
+    return orjson.dumps({
+        model: {
+            "input_per_1k": info["input"],
+            "output_per_1k": info["output"],
+            "context_window": info["context_window"],
         }
-        for t in templates
-    ]
+        for model, info in PRICING.items()
+    })
+
+
+@lru_cache(maxsize=64)
+def _etag(body: bytes) -> str:
+    """Strong ETag for a static payload (computed once per payload)"""
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def _static_json_response(request: Request, body: bytes) -> Response:
+    """
+    Serve a pre-encoded JSON payload, or 304 if the client already has it
+
+    Args:
+        request: Incoming request (checked for If-None-Match)
+        body: Encoded JSON payload
+
+    Returns:
+        200 with the payload, or an empty 304; both carry the ETag
+    """
+    etag = _etag(body)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@app.get("/api/templates")
+async def get_templates(request: Request):
+    """Get all available templates"""
+    metrics.increment_request("templates")
+    return _static_json_response(request, _templates_body())
+
+
+@app.get("/api/templates/category/{category}")
+async def get_templates_by_category(request: Request, category: str):
+    """Get templates by category"""
+    return _static_json_response(request, _category_bodies().get(category, b"[]"))
 
 
 @app.get("/api/templates/{template_id}")
@@ -221,6 +349,7 @@ async def get_template_by_id(template_id: str):
             "system_prompt": template.system_prompt,
             "category": template.category,
             "example_values": template.example_values,
+            "example_rendered": template.example_rendered,
         }
     except ValueError:
         raise HTTPException(status_code=404, detail=f"Template '{template_id}' not found")
@@ -244,163 +373,438 @@ async def render_template_endpoint(request: TemplateRequest):
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@app.post("/api/compare", response_model=CompareResponse)
-@limiter.limit("20/minute")
-async def compare_prompts(request: Request, compare_request: CompareRequest):
+# Provider results below are built with model_construct: every field comes
+# from our own code or the cache, so pydantic validation would be redundant.
+
+def _resolve_model(provider_name: str, compare_request: CompareRequest) -> Optional[str]:
+    """Get the requested model for a provider (None means provider default)"""
+    if compare_request.models and provider_name in compare_request.models:
+        return compare_request.models[provider_name]
+    return None
+
+
+def _measure(
+    compare_request: CompareRequest,
+    actual_model: str,
+    response_text: str,
+    latency: float,
+    prompt_tokens: Dict[str, int],
+) -> Dict:
     """
-    Compare prompt across multiple LLM providers
+    Estimate tokens and cost for a completed generation
+
+    Args:
+        compare_request: The compare request
+        actual_model: Model that produced the response
+        response_text: Generated text
+        latency: Seconds from request start to completion
+        prompt_tokens: Per-request prompt token counts by tokenizer_key,
+            shared across providers so the prompt is tokenized once per tokenizer
+
+    Returns:
+        Dict of the remaining ResponseCache.put() fields
     """
-    start_time = time.time()
-    metrics.increment_request("compare")
+    # Same prompt for every provider
+    tokenizer = tokenizer_key(actual_model)
+    input_tokens = prompt_tokens.get(tokenizer)
+    if input_tokens is None:
+        # First provider on this tokenizer: count prompt and response together
+        input_tokens, output_tokens = estimate_tokens_batch(
+            [compare_request.prompt, response_text], actual_model
+        )
+        prompt_tokens[tokenizer] = input_tokens
+    else:
+        output_tokens = estimate_tokens(response_text, actual_model)
+    cost = calculate_cost(actual_model, input_tokens, output_tokens)
 
-    logger.info(f"Compare request: {len(compare_request.providers)} providers, prompt={compare_request.prompt[:50]}...")
+    return {
+        "response": response_text,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cost": cost,
+        "latency": latency,
+    }
 
-    results = []
-    total_cost = 0.0
 
-    for provider_name in compare_request.providers:
-        provider_start = time.time()
-
-        try:
-            # Get model name (use provided or default)
-            model = None
-            if compare_request.models and provider_name in compare_request.models:
-                model = compare_request.models[provider_name]
-
-            # Create provider to get actual model name
-            logger.debug(f"Creating provider: {provider_name} (model={model})")
-            provider = create_provider(
-                provider_name,
-                model=model,
-                temperature=compare_request.temperature,
-                max_tokens=compare_request.max_tokens,
+# Zeroed error result; failures copy it and fill in the varying fields
+_EMPTY_ERROR = ProviderResponse.model_construct(
+    provider="",
+    model="unknown",
+    response="",
+    latency=0.0,
+    cost=0.0,
+    input_tokens=0,
+    output_tokens=0,
+    cached=False,
+    error="",
+)
+
+
+def _error_response(
+    provider_name: str,
+    model: Optional[str],
+    provider_start: float,
+    e: Exception,
+) -> ProviderResponse:
+    """Log a provider failure and turn it into an error result"""
+    if isinstance(e, asyncio.TimeoutError):
+        error = f"Timed out after {settings.llm_timeout}s"
+    else:
+        error = str(e) or type(e).__name__
+
+    logger.error(f"Error with {provider_name}: {error}", exc_info=True)
+    metrics.record_error("llm")
+
+    return _EMPTY_ERROR.model_copy(update={
+        "provider": provider_name,
+        "model": model or "unknown",
+        "latency": time.perf_counter() - provider_start,
+        "error": error,
+    })
+
+
+async def _compare_provider(
+    provider_name: str,
+    compare_request: CompareRequest,
+    prompt_tokens: Dict[str, int],
+    prompt_hash: int,
+) -> ProviderResponse:
+    """
+    Run the compare prompt against a single provider (cache-aware)
+
+    Args:
+        provider_name: Provider to query
+        compare_request: The compare request
+        prompt_tokens: Shared prompt token counts (see _measure)
+        prompt_hash: ResponseCache.prompt_hash of the request, computed once
+    """
+    provider_start = time.perf_counter()
+    model = None
+
+    try:
+        model = _resolve_model(provider_name, compare_request)
+
+        # One shared provider per name; request parameters go per call
+        provider = get_provider(provider_name)
+        actual_model = model or provider.get_model_name()
+
+        async def generate() -> Dict:
+            logger.info(f"Generating with {actual_model} (cache miss)")
+            response_text = await asyncio.wait_for(
+                provider.generate(
+                    compare_request.prompt,
+                    system_prompt=compare_request.system_prompt,
+                    model=actual_model,
+                    temperature=compare_request.temperature,
+                    max_tokens=compare_request.max_tokens,
+                ),
+                timeout=settings.llm_timeout,
             )
-            actual_model = provider.get_model_name()
-
-            # Check cache first
-            cached = response_cache.get(
-                prompt=compare_request.prompt,
-                provider=provider_name,
-                model=actual_model,
-                temperature=compare_request.temperature,
-                system_prompt=compare_request.system_prompt,
+
+            fields = _measure(
+                compare_request, actual_model, response_text,
+                time.perf_counter() - provider_start, prompt_tokens,
             )
+            logger.debug(f"{provider_name} complete: {fields['latency']:.2f}s, ${fields['cost']:.4f}")
+            return fields
+
+        # Serve from cache, share an identical in-flight call, or generate
+        entry, cached = await response_cache.get_or_compute(
+            generate,
+            prompt=compare_request.prompt,
+            provider=provider_name,
+            model=actual_model,
+            temperature=compare_request.temperature,
+            system_prompt=compare_request.system_prompt,
+            prompt_hash=prompt_hash,
+        )
+
+        return ProviderResponse.model_construct(
+            provider=provider_name,
+            model=actual_model,
+            response=entry.response,
+            latency=entry.latency,
+            cost=entry.cost,
+            input_tokens=entry.input_tokens,
+            output_tokens=entry.output_tokens,
+            cached=cached,
+        )
+
+    except Exception as e:
+        return _error_response(provider_name, model, provider_start, e)
+
+
+async def _stream_provider(
+    provider_name: str,
+    compare_request: CompareRequest,
+    prompt_tokens: Dict[str, int],
+    prompt_hash: int,
+    events: asyncio.Queue,
+) -> ProviderResponse:
+    """
+    Stream a single provider's output into events, caching the full response
+
+    Puts {"provider", "delta"} events as text arrives, then always exactly
+    one {"provider", "result"} event (also on error). Cache hits and
+    requests that joined an identical in-flight call get one delta with
+    the whole response.
+    """
+    provider_start = time.perf_counter()
+    model = None
 
-            if cached:
-                logger.info(f"Cache hit for {provider_name}/{actual_model}")
-                results.append(ProviderResponse(
-                    provider=provider_name,
+    try:
+        model = _resolve_model(provider_name, compare_request)
+        provider = get_provider(provider_name)
+        actual_model = model or provider.get_model_name()
+
+        async def generate() -> Dict:
+            logger.info(f"Streaming with {actual_model} (cache miss)")
+            chunks: List[str] = []
+
+            async def consume():
+                async for delta in provider.generate_stream(
+                    compare_request.prompt,
+                    system_prompt=compare_request.system_prompt,
                     model=actual_model,
-                    response=cached.response,
-                    latency=cached.latency,
-                    cost=cached.cost,
-                    input_tokens=cached.input_tokens,
-                    output_tokens=cached.output_tokens,
-                    cached=True,
-                ))
-                # Don't add to total_cost for cached responses
+                    temperature=compare_request.temperature,
+                    max_tokens=compare_request.max_tokens,
+                ):
+                    chunks.append(delta)
+                    await events.put({"provider": provider_name, "delta": delta})
+
+            await asyncio.wait_for(consume(), timeout=settings.llm_timeout)
+
+            # Cached like a regular compare would be
+            return _measure(
+                compare_request, actual_model, "".join(chunks),
+                time.perf_counter() - provider_start, prompt_tokens,
+            )
+
+        # Serve from cache, share an identical in-flight call (streamed or
+        # not), or stream a new one
+        entry, cached = await response_cache.get_or_compute(
+            generate,
+            prompt=compare_request.prompt,
+            provider=provider_name,
+            model=actual_model,
+            temperature=compare_request.temperature,
+            system_prompt=compare_request.system_prompt,
+            prompt_hash=prompt_hash,
+        )
+        if cached:
+            # Nothing was streamed for this request; replay it as one delta
+            await events.put({"provider": provider_name, "delta": entry.response})
+
+        result = ProviderResponse.model_construct(
+            provider=provider_name,
+            model=actual_model,
+            response=entry.response,
+            latency=entry.latency,
+            cost=entry.cost,
+            input_tokens=entry.input_tokens,
+            output_tokens=entry.output_tokens,
+            cached=cached,
+        )
+
+    except Exception as e:
+        result = _error_response(provider_name, model, provider_start, e)
+
+    await events.put({"provider": provider_name, "result": result.model_dump()})
+    return result
+
+
+def _resolve_providers(compare_request: CompareRequest) -> List[str]:
+    """
+    Dedupe requested providers (order-preserving) and reject unknown ones
+
+    Raises:
+        HTTPException: 400 if any provider is unsupported
+    """
+    # ["openai", "openai"] costs one call
+    providers = list(dict.fromkeys(p.lower() for p in compare_request.providers))
+
+    unknown = [p for p in providers if p not in SUPPORTED_PROVIDERS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported provider(s): {', '.join(unknown)}. Use 'openai' or 'anthropic'",
+        )
+
+    return providers
+
+
+def _summarize(results: List[ProviderResponse]) -> Tuple[float, str, str]:
+    """
+    Aggregate compare results
+
+    Returns:
+        Tuple of (total_cost, fastest, cheapest); cached responses don't
+        add to total_cost
+    """
+    total_cost = 0.0
+    fastest_r = cheapest_r = None
+
+    # One pass: cost total plus fastest/cheapest among successful results
+    for r in results:
+        if not r.cached:
+            total_cost += r.cost
+        if r.error:
+            continue
+        if fastest_r is None or r.latency < fastest_r.latency:
+            fastest_r = r
+        if cheapest_r is None or r.cost < cheapest_r.cost:
+            cheapest_r = r
+
+    fastest = fastest_r.provider if fastest_r else "none"
+    cheapest = cheapest_r.provider if cheapest_r else "none"
+
+    return total_cost, fastest, cheapest
+
+
+async def _stream_events(
+    providers: List[str],
+    compare_request: CompareRequest,
+    start_time: float,
+    include_deltas: bool = True,
+):
+    """
+    Yield NDJSON compare events as providers stream, then the summary line
+
+    Args:
+        providers: Resolved providers (see _resolve_providers)
+        compare_request: The compare request
+        start_time: perf_counter() at request start, for response time metrics
+        include_deltas: Emit {"provider", "delta"} events; if False only the
+            per-provider {"provider", "result"} events and the summary
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    prompt_tokens: Dict[str, int] = {}
+    prompt_hash = response_cache.prompt_hash(compare_request.prompt, compare_request.system_prompt)
+    tasks = [
+        asyncio.create_task(
+            _stream_provider(name, compare_request, prompt_tokens, prompt_hash, events)
+        )
+        for name in providers
+    ]
+
+    try:
+        pending = len(tasks)
+        while pending:
+            event = await events.get()
+            if "result" in event:
+                pending -= 1
+            elif not include_deltas:
                 continue
+            yield orjson.dumps(event) + b"\n"
 
-            # Generate response
-            logger.info(f"Generating with {actual_model} (cache miss)")
-            response_text = provider.generate(
-                compare_request.prompt,
-                system_prompt=compare_request.system_prompt,
-            )
+        results = [task.result() for task in tasks]
+        total_cost, fastest, cheapest = _summarize(results)
+        metrics.record_response_time(time.perf_counter() - start_time)
 
-            latency = time.time() - provider_start
-
-            # Estimate tokens and cost
-            input_tokens = estimate_tokens(compare_request.prompt, actual_model)
-            output_tokens = estimate_tokens(response_text, actual_model)
-            cost = calculate_cost(actual_model, input_tokens, output_tokens)
-            total_cost += cost
-
-            # Cache the response
-            response_cache.put(
-                prompt=compare_request.prompt,
-                provider=provider_name,
-                model=actual_model,
-                response=response_text,
-                input_tokens=input_tokens,
-                output_tokens=output_tokens,
-                cost=cost,
-                latency=latency,
-                temperature=compare_request.temperature,
-                system_prompt=compare_request.system_prompt,
-            )
+        yield orjson.dumps({
+            "total_cost": total_cost,
+            "fastest": fastest,
+            "cheapest": cheapest,
+        }) + b"\n"
+    finally:
+        # Client went away (or we're done): stop any provider still streaming
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/api/compare", response_model=CompareResponse)
+@limiter.limit("20/minute")
+async def compare_prompts(request: Request, compare_request: StreamableCompareRequest):
+    """
+    Compare prompt across multiple LLM providers
+
+    Providers are queried concurrently, so total latency tracks the
+    slowest provider rather than the sum of all of them. Duplicate
+    providers are queried once; unknown providers are rejected up front.
 
-            logger.debug(f"{provider_name} complete: {latency:.2f}s, ${cost:.4f}")
-
-            results.append(ProviderResponse(
-                provider=provider_name,
-                model=actual_model,
-                response=response_text,
-                latency=latency,
-                cost=cost,
-                input_tokens=input_tokens,
-                output_tokens=output_tokens,
-                cached=False,
-            ))
-
-        except Exception as e:
-            logger.error(f"Error with {provider_name}: {str(e)}", exc_info=True)
-            metrics.record_error("llm")
-
-            results.append(ProviderResponse(
-                provider=provider_name,
-                model=model or "unknown",
-                response="",
-                latency=time.time() - provider_start,
-                cost=0.0,
-                input_tokens=0,
-                output_tokens=0,
-                error=str(e),
-            ))
-
-    # Find fastest and cheapest
-    successful_results = [r for r in results if not r.error]
-
-    fastest = "none"
-    cheapest = "none"
-
-    if successful_results:
-        fastest = min(successful_results, key=lambda r: r.latency).provider
-        cheapest = min(successful_results, key=lambda r: r.cost).provider
-
-    total_time = time.time() - start_time
+    With stream=true the response is NDJSON instead, in the same event
+    format as /api/compare/stream minus the deltas: one
+    {"provider", "result"} line per provider as it completes, then a
+    {"total_cost", "fastest", "cheapest"} line.
+    """
+    start_time = time.perf_counter()
+    metrics.increment_request("compare")
+
+    providers = _resolve_providers(compare_request)
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(f"Compare request: {len(providers)} providers, prompt={compare_request.prompt[:50]}...")
+
+    if compare_request.stream:
+        return StreamingResponse(
+            _stream_events(providers, compare_request, start_time, include_deltas=False),
+            media_type="application/x-ndjson",
+        )
+
+    # Shared by every provider: tokenize and hash the prompt once
+    prompt_tokens: Dict[str, int] = {}
+    prompt_hash = response_cache.prompt_hash(compare_request.prompt, compare_request.system_prompt)
+
+    results = await asyncio.gather(*(
+        _compare_provider(provider_name, compare_request, prompt_tokens, prompt_hash)
+        for provider_name in providers
+    ))
+
+    total_cost, fastest, cheapest = _summarize(results)
+
+    total_time = time.perf_counter() - start_time
     metrics.record_response_time(total_time)
 
-    logger.info(f"Compare complete: {len(results)} results, ${total_cost:.4f}, {total_time:.2f}s")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(f"Compare complete: {len(results)} results, ${total_cost:.4f}, {total_time:.2f}s")
 
-    return CompareResponse(
+    # Every field was built here (or came from the cache), so skip
+    # re-validating it against response_model and encode directly
+    response = CompareResponse.model_construct(
         prompt=compare_request.prompt,
         results=results,
         total_cost=total_cost,
         fastest=fastest,
         cheapest=cheapest,
     )
+    return ORJSONResponse(response.model_dump())
+
+
+@app.post("/api/compare/stream")
+@limiter.limit("20/minute")
+async def compare_prompts_stream(request: Request, compare_request: CompareRequest):
+    """
+    Compare prompt across providers, streaming output as NDJSON
+
+    Each line is one event:
+    - {"provider": ..., "delta": ...} as text arrives (interleaved across providers)
+    - {"provider": ..., "result": ProviderResponse} once per provider
+    - {"total_cost": ..., "fastest": ..., "cheapest": ...} last
+    """
+    start_time = time.perf_counter()
+    metrics.increment_request("compare")
+
+    providers = _resolve_providers(compare_request)
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(f"Compare stream: {len(providers)} providers, prompt={compare_request.prompt[:50]}...")
+
+    return StreamingResponse(
+        _stream_events(providers, compare_request, start_time),
+        media_type="application/x-ndjson",
+    )
 
 
 @app.get("/api/pricing")
-async def get_pricing():
+async def get_pricing(request: Request):
     """Get pricing information for all models"""
-    from prompts.cost import PRICING
-
-    return {
-        model: {
-            "input_per_1k": info["input"],
-            "output_per_1k": info["output"],
-            "context_window": info["context_window"],
-        }
-        for model, info in PRICING.items()
-    }
+    return _static_json_response(request, _pricing_body())
 
 
 @app.get("/api/categories")
-async def get_categories():
+async def get_categories(request: Request):
     """Get all template categories"""
-    return get_all_categories()
+    return _static_json_response(request, _categories_body())
 
 
 @app.get("/api/cache/stats")
@@ -412,10 +816,30 @@ async def get_cache_stats():
 @app.post("/api/cache/clear")
 async def clear_cache():
     """Clear response cache"""
-    response_cache.clear()
+    await response_cache.clear_async()
     return {"message": "Cache cleared successfully"}
 
 
+def _optimize_response(result: OptimizationResult) -> OptimizeResponse:
+    """Convert an optimizer result to its API response"""
+    return OptimizeResponse(
+        score=result.score,
+        issues=[
+            OptimizationIssueResponse(
+                type=issue.type.value,
+                severity=issue.severity.value,
+                message=issue.message,
+                suggestion=issue.suggestion,
+                example=issue.example,
+            )
+            for issue in result.issues
+        ],
+        token_count=result.token_count,
+        estimated_cost=result.estimated_cost,
+        optimized_prompt=result.optimized_prompt,
+    )
+
+
 @app.post("/api/optimize", response_model=OptimizeResponse)
 async def optimize_prompt(optimize_request: OptimizeRequest):
     """
@@ -462,35 +886,55 @@ async def optimize_prompt(optimize_request: OptimizeRequest):
         target_output_length=optimize_request.target_output_length,
     )
 
-    return OptimizeResponse(
-        score=result.score,
-        issues=[
-            OptimizationIssueResponse(
-                type=issue.type.value,
-                severity=issue.severity.value,
-                message=issue.message,
-                suggestion=issue.suggestion,
-                example=issue.example,
-            )
-            for issue in result.issues
-        ],
-        token_count=result.token_count,
-        estimated_cost=result.estimated_cost,
-        optimized_prompt=result.optimized_prompt,
+    return _optimize_response(result)
+
+
+@app.post("/api/optimize/batch", response_model=OptimizeBatchResponse)
+async def optimize_prompts_batch(batch_request: OptimizeBatchRequest):
+    """
+    Analyze several prompts in one request
+
+    Same analysis as /api/optimize, for up to optimize_batch_max prompts
+    sharing one model. Runs off the event loop; repeated prompts are
+    analyzed once.
+    """
+    metrics.increment_request("optimize")
+
+    results = await asyncio.to_thread(
+        prompt_optimizer.analyze_batch,
+        batch_request.prompts,
+        batch_request.model,
+        batch_request.target_output_length,
     )
 
+    return OptimizeBatchResponse(results=[_optimize_response(result) for result in results])
+
 
 # Serve frontend static files
 frontend_path = Path(__file__).parent.parent / "frontend"
 if frontend_path.exists():
-    app.mount("/static", StaticFiles(directory=str(frontend_path)), name="static")
+    # Read into memory once; served with ETags
+    frontend_files = CachedStaticFiles(directory=str(frontend_path))
+    app.mount("/static", frontend_files, name="static")
 
     @app.get("/")
-    async def serve_frontend():
+    async def serve_frontend(request: Request):
         """Serve frontend HTML"""
-        return FileResponse(str(frontend_path / "index.html"))
+        return await frontend_files.get_response("index.html", request.scope)
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+
+    # Import string (not the app object) so multiple workers can be spawned
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8001,
+        loop="uvloop",
+        http="httptools",
+        workers=settings.workers,
+        backlog=2048,
+        timeout_keep_alive=settings.keepalive_timeout,
+        proxy_headers=True,
+    )
@@ -4,13 +4,13 @@ Metrics and monitoring for LLM Safety Playground
 
 from typing import Dict
 from dataclasses import dataclass, field
-from datetime import datetime
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class Metrics:
     """Application metrics"""
 
@@ -34,7 +34,6 @@ class Metrics:
     bias_blocks: int = 0
 
     # Performance metrics
-    average_response_time: float = 0.0
     total_response_time: float = 0.0
 
     # Error metrics
@@ -42,8 +41,8 @@ class Metrics:
     llm_errors: int = 0
     filter_errors: int = 0
 
-    # Timestamp
-    started_at: datetime = field(default_factory=datetime.now)
+    # Start time (monotonic, for uptime)
+    _started_perf: float = field(default_factory=time.monotonic)
 
     def increment_request(self, endpoint: str):
         """Increment request counter"""
@@ -81,11 +80,16 @@ class Metrics:
         else:
             self.outputs_passed += 1
 
+    @property
+    def average_response_time(self) -> float:
+        """Mean response time per request (computed on read)"""
+        if self.total_requests > 0:
+            return self.total_response_time / self.total_requests
+        return 0.0
+
     def record_response_time(self, duration: float):
         """Record response time"""
         self.total_response_time += duration
-        if self.total_requests > 0:
-            self.average_response_time = self.total_response_time / self.total_requests
 
     def record_error(self, error_type: str):
         """Record error"""
@@ -97,7 +101,7 @@ class Metrics:
 
     def get_summary(self) -> Dict:
         """Get metrics summary"""
-        uptime = (datetime.now() - self.started_at).total_seconds()
+        uptime = time.monotonic() - self._started_perf
 
         return {
             "uptime_seconds": uptime,
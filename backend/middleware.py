@@ -7,56 +7,84 @@ import logging
 from typing import Callable
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
+from config import settings
+
 logger = logging.getLogger(__name__)
 
 # Rate limiter
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(
+    key_func=get_remote_address,
+    strategy=settings.rate_limit_strategy,
+    storage_uri=settings.rate_limit_storage_uri,
+)
 
 
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
     """Log all requests and responses with timing"""
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
+        start_time = time.perf_counter()
+        log_enabled = logger.isEnabledFor(logging.INFO)
 
         # Log request
-        logger.info(
-            f"Request: {request.method} {request.url.path} "
-            f"from {request.client.host if request.client else 'unknown'}"
-        )
+        if log_enabled:
+            logger.info(
+                f"Request: {request.method} {request.url.path} "
+                f"from {request.client.host if request.client else 'unknown'}"
+            )
 
         # Process request
         response = await call_next(request)
 
         # Calculate duration
-        duration = time.time() - start_time
+        duration = f"{time.perf_counter() - start_time:.3f}"
 
         # Log response
-        logger.info(
-            f"Response: {request.method} {request.url.path} "
-            f"status={response.status_code} duration={duration:.3f}s"
-        )
+        if log_enabled:
+            logger.info(
+                f"Response: {request.method} {request.url.path} "
+                f"status={response.status_code} duration={duration}s"
+            )
 
         # Add custom headers
-        response.headers["X-Process-Time"] = str(duration)
+        response.headers["X-Process-Time"] = duration
         response.headers["X-API-Version"] = "1.0.0"
 
         return response
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Add security headers to all responses"""
+# Security headers added to every HTTP response (constant, encoded once)
+_SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+]
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
 
-        # Security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+class SecurityHeadersMiddleware:
+    """
+    Add security headers to all responses
 
-        return response
+    Pure ASGI middleware: appends the headers to the response start
+    message, avoiding BaseHTTPMiddleware's extra task and body streaming.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *_SECURITY_HEADERS]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -2,12 +2,17 @@
 LLM cost calculation and tracking
 """
 
-from typing import Dict, Tuple
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+import os
 import tiktoken
 
 
 # Pricing per 1K tokens (as of Oct 2025)
-PRICING = {
+_PRICING_TABLE = {
     # OpenAI
     "gpt-4": {
         "input": 0.03,
@@ -58,6 +63,25 @@ PRICING = {
     },
 }
 
+# Read-only, since the flat rate tables below are snapshots of it
+PRICING: Mapping[str, Mapping[str, float]] = MappingProxyType({
+    model: MappingProxyType(info) for model, info in _PRICING_TABLE.items()
+})
+_UNKNOWN_PRICING: Mapping[str, float] = MappingProxyType({
+    "input": 0,
+    "output": 0,
+    "context_window": 0,
+})
+
+# Flat per-token rates, indexed via _MODEL_IDX, for the hot cost path
+_MODEL_IDX: Dict[str, int] = {model: i for i, model in enumerate(PRICING)}
+_INPUT_PER_TOK = array("d", [p["input"] / 1000 for p in PRICING.values()])
+_OUTPUT_PER_TOK = array("d", [p["output"] / 1000 for p in PRICING.values()])
+
+# format_cost precision by magnitude: below 0.001, 0.01, 0.1, then the rest
+_COST_THRESHOLDS = (0.001, 0.01, 0.1)
+_COST_FORMATS = ("${:.6f}", "${:.5f}", "${:.4f}", "${:.3f}")
+
 
 def calculate_cost(
     model: str,
@@ -75,16 +99,53 @@ def calculate_cost(
     Returns:
         Total cost in USD
     """
-    pricing = PRICING.get(model)
+    if not (input_tokens or output_tokens):
+        # Nothing billed (e.g. a failed generation)
+        return 0.0
+
+    idx = _MODEL_IDX.get(model)
 
-    if not pricing:
+    if idx is None:
         # Unknown model, return 0
         return 0.0
 
-    input_cost = (input_tokens / 1000) * pricing["input"]
-    output_cost = (output_tokens / 1000) * pricing["output"]
+    return input_tokens * _INPUT_PER_TOK[idx] + output_tokens * _OUTPUT_PER_TOK[idx]
+
 
-    return input_cost + output_cost
+@lru_cache(maxsize=32)
+def _get_encoding(model: str) -> Optional["tiktoken.Encoding"]:
+    """
+    Resolve (once per model) the tiktoken encoding for a model
+
+    Models tiktoken doesn't know get cl100k_base. Returns None if no
+    encoding can be loaded (e.g. the BPE files can't be fetched), so callers
+    use the rough estimate without retrying the lookup on every call.
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        pass
+
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def warm_encodings() -> int:
+    """
+    Load tiktoken encodings for every priced OpenAI model
+
+    Call at startup so the first request doesn't pay for BPE loading.
+
+    Returns:
+        Number of models with a usable encoding
+    """
+    return sum(
+        _get_encoding(model) is not None
+        for model in PRICING
+        if model.startswith("gpt")
+    )
 
 
 def estimate_tokens(text: str, model: str = "gpt-4") -> int:
@@ -98,17 +159,51 @@ def estimate_tokens(text: str, model: str = "gpt-4") -> int:
     Returns:
         Estimated token count
     """
-    try:
-        # Use tiktoken for OpenAI models
-        if model.startswith("gpt"):
-            encoding = tiktoken.encoding_for_model(model)
-            return len(encoding.encode(text))
-        else:
-            # Rough estimate for Claude: ~4 chars per token
-            return len(text) // 4
-    except Exception:
-        # Fallback: rough estimate
-        return len(text) // 4
+    # Use tiktoken for OpenAI models
+    if model.startswith("gpt"):
+        encoding = _get_encoding(model)
+        if encoding is not None:
+            try:
+                # Plain text: skip special-token scanning
+                return len(encoding.encode_ordinary(text))
+            except Exception:
+                pass
+
+    # Rough estimate (Claude, or tokenizer unavailable): ~4 chars per token
+    return len(text) // 4
+
+
+def estimate_tokens_batch(texts: List[str], model: str = "gpt-4") -> List[int]:
+    """
+    Estimate token counts for several texts in one tokenizer call
+
+    Args:
+        texts: Texts to count tokens for
+        model: Model name (affects tokenizer)
+
+    Returns:
+        Estimated token count per text, in order
+    """
+    if model.startswith("gpt") and len(texts) > 1:
+        encoding = _get_encoding(model)
+        if encoding is not None:
+            try:
+                num_threads = min(len(texts), os.cpu_count() or 1)
+                return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts, num_threads=num_threads)]
+            except Exception:
+                pass
+
+    return [estimate_tokens(text, model) for text in texts]
+
+
+def tokenizer_key(model: str) -> str:
+    """
+    Identify the tokenizer estimate_tokens uses for a model
+
+    Models with the same key always get the same count for the same text,
+    so callers can estimate once and share the result.
+    """
+    return model if model.startswith("gpt") else "approx"
 
 
 def format_cost(cost: float) -> str:
@@ -123,14 +218,7 @@ def format_cost(cost: float) -> str:
     """
     if cost == 0:
         return "$0.00"
-    elif cost < 0.001:
-        return f"${cost:.6f}"
-    elif cost < 0.01:
-        return f"${cost:.5f}"
-    elif cost < 0.1:
-        return f"${cost:.4f}"
-    else:
-        return f"${cost:.3f}"
+    return _COST_FORMATS[bisect_right(_COST_THRESHOLDS, cost)].format(cost)
 
 
 def get_cost_breakdown(
@@ -149,10 +237,14 @@ def get_cost_breakdown(
     Returns:
         Dict with cost breakdown
     """
-    pricing = PRICING.get(model, {"input": 0, "output": 0})
+    pricing = PRICING.get(model, _UNKNOWN_PRICING)
+    idx = _MODEL_IDX.get(model)
 
-    input_cost = (input_tokens / 1000) * pricing["input"]
-    output_cost = (output_tokens / 1000) * pricing["output"]
+    if idx is None:
+        input_cost = output_cost = 0.0
+    else:
+        input_cost = input_tokens * _INPUT_PER_TOK[idx]
+        output_cost = output_tokens * _OUTPUT_PER_TOK[idx]
     total_cost = input_cost + output_cost
 
     return {
@@ -185,8 +277,7 @@ def compare_costs(
     Returns:
         Dict mapping model names to cost breakdowns
     """
-    input_tokens = estimate_tokens(prompt)
-    output_tokens = estimate_tokens(response)
+    input_tokens, output_tokens = estimate_tokens_batch([prompt, response])
 
     comparisons = {}
     for model in models:
@@ -209,10 +300,6 @@ def get_cheapest_model(costs: Dict[str, Dict]) -> Tuple[str, float]:
     return cheapest[0], cheapest[1]["total_cost"]
 
 
-def get_pricing_info(model: str) -> Dict:
-    """Get pricing information for a model"""
-    return PRICING.get(model, {
-        "input": 0,
-        "output": 0,
-        "context_window": 0,
-    })
+def get_pricing_info(model: str) -> Mapping[str, float]:
+    """Get pricing information for a model (read-only)"""
+    return PRICING.get(model, _UNKNOWN_PRICING)
@@ -4,12 +4,95 @@ Provides suggestions to improve prompt quality and reduce costs
 """
 
 import re
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass
+import threading
+from functools import lru_cache
+from typing import List, Dict, FrozenSet, Mapping, Optional, Tuple
+from dataclasses import dataclass, field, replace
 from enum import Enum
+from types import MappingProxyType
+
+from .cost import estimate_tokens, estimate_tokens_batch
+
+
+# Keywords the checks look for, by category. Matched as whole words or
+# phrases, so "mightily" doesn't count as "might" nor "handsome" as "some"
+# (task verbs also match their inflections, see _INFLECTED_KEYWORDS).
+_KEYWORDS: Dict[str, FrozenSet[str]] = {
+    "vague": frozenset(('maybe', 'perhaps', 'kind of', 'sort of', 'probably', 'might')),
+    "task": frozenset(('you must', 'your task is', 'please', 'generate', 'write', 'create')),
+    "generic": frozenset(('something', 'anything', 'whatever', 'some')),
+    "length_unit": frozenset(('words', 'sentences', 'paragraphs', 'lines', 'characters', 'tokens')),
+    "polite": frozenset(('please', 'kindly', 'if you could', 'would you mind')),
+}
+_ALL_KEYWORDS: Tuple[str, ...] = tuple(sorted(frozenset().union(*_KEYWORDS.values())))
+
+# Task verbs also count in inflected and re- forms ("writes", "rewriting",
+# "created"), just not as parts of other words ("writer", "creative").
+# keyword -> (substring every match contains, pattern)
+_INFLECTED_KEYWORDS: Dict[str, Tuple[str, str]] = {
+    'write': ('writ', r'\b(?:re)?writ(?:e|es|ing)\b'),
+    'create': ('creat', r'\b(?:re)?creat(?:e|es|ed|ing)\b'),
+    'generate': ('generat', r'\b(?:re)?generat(?:e|es|ed|ing)\b'),
+}
+
+# (keyword, cheap substring prefilter, word-boundary pattern) per keyword
+_KEYWORD_SCAN: Tuple[Tuple[str, str, "re.Pattern[str]"], ...] = tuple(
+    (keyword, probe, re.compile(pattern))
+    for keyword in _ALL_KEYWORDS
+    for probe, pattern in [
+        _INFLECTED_KEYWORDS.get(keyword, (keyword, r'\b' + re.escape(keyword) + r'\b'))
+    ]
+)
+
+# Matched as plain substrings, so "examples" and "formatted" count too
+_SUBSTRING_KEYWORDS: Dict[str, FrozenSet[str]] = {
+    "example": frozenset(('example',)),
+    "format": frozenset(('format', 'json')),
+}
+
+# Ambiguous pronouns, and a "the X is ..." definition that may resolve them
+_PRONOUN_RE = re.compile(r'\b(?:it|this|that|these|those|they)\b')
+_DEFINITION_RE = re.compile(r'\b(?:the|a|an)\s+\w+\s+(?:is|are|was|were)')
+
+# Simplified pricing: model -> (input, output) per 1K tokens
+_PRICING: Mapping[str, Tuple[float, float]] = MappingProxyType({
+    'gpt-4': (0.03, 0.06),
+    'gpt-4-turbo': (0.01, 0.03),
+    'gpt-3.5-turbo': (0.0005, 0.0015),
+    'claude-3-opus': (0.015, 0.075),
+    'claude-3-sonnet': (0.003, 0.015),
+})
+_DEFAULT_PRICING = _PRICING['gpt-4']
+
+# Category -> keywords found, as returned by _scan_keywords
+KeywordHits = Dict[str, FrozenSet[str]]
+
+
+def _scan_keywords(lower: str) -> KeywordHits:
+    """
+    Find which keywords occur in a lowercased prompt
+
+    Each distinct keyword is searched for once, however many checks use it,
+    and only substring hits pay for the word-boundary check.
+
+    Args:
+        lower: Lowercased prompt
+
+    Returns:
+        Dict mapping each category to the set of its keywords found
+    """
+    present = frozenset(
+        keyword for keyword, probe, pattern in _KEYWORD_SCAN
+        if probe in lower and pattern.search(lower)
+    )
+
+    found = {category: keywords & present for category, keywords in _KEYWORDS.items()}
+    for category, keywords in _SUBSTRING_KEYWORDS.items():
+        found[category] = frozenset(keyword for keyword in keywords if keyword in lower)
+    return found
 
 
-class IssueType(Enum):
+class IssueType(str, Enum):
     """Types of prompt issues"""
     CLARITY = "clarity"
     SPECIFICITY = "specificity"
@@ -19,14 +102,14 @@ class IssueType(Enum):
     TONE = "tone"
 
 
-class Severity(Enum):
+class Severity(str, Enum):
     """Issue severity levels"""
     LOW = "low"
     MEDIUM = "medium"
     HIGH = "high"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class OptimizationIssue:
     """An identified issue with the prompt"""
     type: IssueType
@@ -36,11 +119,11 @@ class OptimizationIssue:
     example: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class OptimizationResult:
-    """Result of prompt analysis"""
+    """Result of prompt analysis (issues, a list, is left out of the hash)"""
     score: float  # 0-100
-    issues: List[OptimizationIssue]
+    issues: List[OptimizationIssue] = field(hash=False)
     token_count: int
     estimated_cost: float
     optimized_prompt: Optional[str] = None
@@ -56,8 +139,27 @@ class PromptOptimizer:
     - Proper structure
     - Cost optimization
     - Tone and formatting
+
+    Analysis is a pure function of its arguments, so results are memoized
+    (LRU, cache_size entries per optimizer).
+
+    Token counts use tiktoken's cl100k_base when estimation_mode is
+    "tiktoken" (the default), or ~4 characters per token for "heuristic".
+    analyze_batch tokenizes all of its prompts in one tokenizer call.
     """
 
+    ESTIMATION_MODES = ("tiktoken", "heuristic")
+
+    def __init__(self, cache_size: int = 4096, estimation_mode: str = "tiktoken"):
+        if estimation_mode not in self.ESTIMATION_MODES:
+            raise ValueError(
+                f"Unknown estimation mode '{estimation_mode}'. Use one of: {', '.join(self.ESTIMATION_MODES)}"
+            )
+        self.estimation_mode = estimation_mode
+        self._analyze_cached = lru_cache(maxsize=cache_size)(self._analyze)
+        # Token counts analyze_batch computed up front, per calling thread
+        self._batch_tokens = threading.local()
+
     def analyze(
         self,
         prompt: str,
@@ -75,33 +177,97 @@ class PromptOptimizer:
         Returns:
             OptimizationResult with issues and suggestions
         """
+        result = self._analyze_cached(prompt, model, target_output_length)
+        # Callers get their own issue list; the memoized result stays intact
+        return replace(result, issues=list(result.issues))
+
+    def analyze_batch(
+        self,
+        prompts: List[str],
+        model: str = "gpt-4",
+        target_output_length: int = 500,
+    ) -> List[OptimizationResult]:
+        """
+        Analyze several prompts for the same model
+
+        Prompts repeated within (or across) batches are analyzed once,
+        via the memo. In tiktoken mode the distinct prompts are tokenized
+        together (estimate_tokens_batch) rather than one call per prompt.
+
+        Args:
+            prompts: Prompts to analyze
+            model: Target model name
+            target_output_length: Expected output length in tokens
+
+        Returns:
+            One OptimizationResult per prompt, in order
+        """
+        if self.estimation_mode != "tiktoken":
+            return [self.analyze(prompt, model, target_output_length) for prompt in prompts]
+
+        unique = list(dict.fromkeys(prompts))
+        self._batch_tokens.counts = dict(zip(unique, estimate_tokens_batch(unique, model="gpt-4")))
+        try:
+            return [self.analyze(prompt, model, target_output_length) for prompt in prompts]
+        finally:
+            self._batch_tokens.counts = None
+
+    def clear_cache(self):
+        """Drop all memoized analysis results"""
+        self._analyze_cached.cache_clear()
+
+    def get_cache_stats(self) -> Dict:
+        """Get memo statistics (size, hits, misses, hit rate)"""
+        info = self._analyze_cached.cache_info()
+        lookups = info.hits + info.misses
+
+        return {
+            "size": info.currsize,
+            "max_size": info.maxsize,
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_rate": info.hits / lookups * 100 if lookups > 0 else 0,
+        }
+
+    def _analyze(
+        self,
+        prompt: str,
+        model: str,
+        target_output_length: int,
+    ) -> OptimizationResult:
+        """Run every check (uncached)"""
         issues = []
         score = 100.0
 
+        # Lowercased once; it and the keyword hits are shared by every check
+        lower = prompt.lower()
+        keywords = _scan_keywords(lower)
+
+        token_count = self._estimate_tokens(prompt)
+
         # Check length
-        length_issues = self._check_length(prompt)
+        length_issues = self._check_length(token_count)
         issues.extend(length_issues)
         score -= len(length_issues) * 5
 
         # Check clarity
-        clarity_issues = self._check_clarity(prompt)
+        clarity_issues = self._check_clarity(lower, keywords)
         issues.extend(clarity_issues)
         score -= len(clarity_issues) * 10
 
         # Check structure
-        structure_issues = self._check_structure(prompt)
+        structure_issues = self._check_structure(prompt, keywords)
         issues.extend(structure_issues)
         score -= len(structure_issues) * 8
 
         # Check specificity
-        specificity_issues = self._check_specificity(prompt)
+        specificity_issues = self._check_specificity(prompt, keywords)
         issues.extend(specificity_issues)
         score -= len(specificity_issues) * 7
 
         # Check cost optimization
-        token_count = self._estimate_tokens(prompt)
         estimated_cost = self._estimate_cost(token_count, target_output_length, model)
-        cost_issues = self._check_cost(prompt, token_count)
+        cost_issues = self._check_cost(prompt, token_count, keywords)
         issues.extend(cost_issues)
         score -= len(cost_issues) * 3
 
@@ -118,10 +284,9 @@ class PromptOptimizer:
             optimized_prompt=optimized,
         )
 
-    def _check_length(self, prompt: str) -> List[OptimizationIssue]:
+    def _check_length(self, tokens: int) -> List[OptimizationIssue]:
         """Check if prompt length is optimal"""
         issues = []
-        tokens = self._estimate_tokens(prompt)
 
         if tokens < 20:
             issues.append(OptimizationIssue(
@@ -141,13 +306,12 @@ class PromptOptimizer:
 
         return issues
 
-    def _check_clarity(self, prompt: str) -> List[OptimizationIssue]:
+    def _check_clarity(self, lower: str, keywords: KeywordHits) -> List[OptimizationIssue]:
         """Check prompt clarity"""
         issues = []
 
         # Check for vague words
-        vague_words = ['maybe', 'perhaps', 'kind of', 'sort of', 'probably', 'might']
-        if any(word in prompt.lower() for word in vague_words):
+        if keywords["vague"]:
             issues.append(OptimizationIssue(
                 type=IssueType.CLARITY,
                 severity=Severity.MEDIUM,
@@ -157,8 +321,8 @@ class PromptOptimizer:
             ))
 
         # Check for ambiguous pronouns
-        if re.search(r'\b(it|this|that|these|those|they)\b', prompt.lower()):
-            if not re.search(r'\b(the|a|an)\s+\w+\s+(is|are|was|were)', prompt.lower()):
+        if _PRONOUN_RE.search(lower):
+            if not _DEFINITION_RE.search(lower):
                 issues.append(OptimizationIssue(
                     type=IssueType.CLARITY,
                     severity=Severity.LOW,
@@ -168,13 +332,12 @@ class PromptOptimizer:
 
         return issues
 
-    def _check_structure(self, prompt: str) -> List[OptimizationIssue]:
+    def _check_structure(self, prompt: str, keywords: KeywordHits) -> List[OptimizationIssue]:
         """Check prompt structure"""
         issues = []
 
         # Check for clear task definition
-        task_indicators = ['you must', 'your task is', 'please', 'generate', 'write', 'create']
-        if not any(indicator in prompt.lower() for indicator in task_indicators):
+        if not keywords["task"]:
             issues.append(OptimizationIssue(
                 type=IssueType.STRUCTURE,
                 severity=Severity.MEDIUM,
@@ -184,7 +347,7 @@ class PromptOptimizer:
             ))
 
         # Check for examples
-        if len(prompt) > 200 and 'example' not in prompt.lower():
+        if len(prompt) > 200 and not keywords["example"]:
             issues.append(OptimizationIssue(
                 type=IssueType.STRUCTURE,
                 severity=Severity.LOW,
@@ -194,7 +357,7 @@ class PromptOptimizer:
             ))
 
         # Check for output format specification
-        if 'format' not in prompt.lower() and 'json' not in prompt.lower():
+        if not keywords["format"]:
             if len(prompt) > 100:
                 issues.append(OptimizationIssue(
                     type=IssueType.STRUCTURE,
@@ -205,13 +368,12 @@ class PromptOptimizer:
 
         return issues
 
-    def _check_specificity(self, prompt: str) -> List[OptimizationIssue]:
+    def _check_specificity(self, prompt: str, keywords: KeywordHits) -> List[OptimizationIssue]:
         """Check if prompt is specific enough"""
         issues = []
 
         # Check for generic words without constraints
-        generic_words = ['something', 'anything', 'whatever', 'some']
-        if any(word in prompt.lower() for word in generic_words):
+        if keywords["generic"]:
             issues.append(OptimizationIssue(
                 type=IssueType.SPECIFICITY,
                 severity=Severity.MEDIUM,
@@ -222,11 +384,7 @@ class PromptOptimizer:
 
         # Check for length/quantity specifications
         if len(prompt) > 100:
-            has_length_spec = any(
-                word in prompt.lower()
-                for word in ['words', 'sentences', 'paragraphs', 'lines', 'characters', 'tokens']
-            )
-            if not has_length_spec:
+            if not keywords["length_unit"]:
                 issues.append(OptimizationIssue(
                     type=IssueType.SPECIFICITY,
                     severity=Severity.LOW,
@@ -237,27 +395,37 @@ class PromptOptimizer:
 
         return issues
 
-    def _check_cost(self, prompt: str, token_count: int) -> List[OptimizationIssue]:
+    def _check_cost(
+        self,
+        prompt: str,
+        token_count: int,
+        keywords: KeywordHits,
+    ) -> List[OptimizationIssue]:
         """Check for cost optimization opportunities"""
         issues = []
 
         # Check for redundant information
-        sentences = prompt.split('.')
-        if len(sentences) > 5:
+        if prompt.count('.') >= 5:
             # Simple check: if many sentences have similar beginnings
-            starts = [s.strip()[:20] for s in sentences if len(s.strip()) > 20]
-            if len(starts) != len(set(starts)):
-                issues.append(OptimizationIssue(
-                    type=IssueType.COST,
-                    severity=Severity.LOW,
-                    message="Prompt may contain redundant information",
-                    suggestion="Remove repetitive content to reduce input tokens",
-                ))
+            seen = set()
+            for sentence in prompt.split('.'):
+                sentence = sentence.strip()
+                if len(sentence) <= 20:
+                    continue
+                start = sentence[:20]
+                if start in seen:
+                    issues.append(OptimizationIssue(
+                        type=IssueType.COST,
+                        severity=Severity.LOW,
+                        message="Prompt may contain redundant information",
+                        suggestion="Remove repetitive content to reduce input tokens",
+                    ))
+                    break
+                seen.add(start)
 
         # Check for unnecessary politeness (in very long prompts)
         if token_count > 500:
-            polite_phrases = ['please', 'kindly', 'if you could', 'would you mind']
-            if sum(phrase in prompt.lower() for phrase in polite_phrases) > 2:
+            if len(keywords["polite"]) > 2:
                 issues.append(OptimizationIssue(
                     type=IssueType.COST,
                     severity=Severity.LOW,
@@ -269,23 +437,21 @@ class PromptOptimizer:
 
     def _estimate_tokens(self, text: str) -> int:
         """Estimate token count"""
+        if self.estimation_mode == "tiktoken":
+            counts = getattr(self._batch_tokens, "counts", None)
+            if counts and text in counts:
+                return max(1, counts[text])
+            # cl100k_base; falls back to ~4 chars/token if tiktoken can't load
+            return max(1, estimate_tokens(text, model="gpt-4"))
+
         # Rough approximation: 1 token ≈ 4 characters
         return max(1, len(text) // 4)
 
     def _estimate_cost(self, input_tokens: int, output_tokens: int, model: str) -> float:
         """Estimate cost for this prompt"""
-        # Simplified pricing (per 1K tokens)
-        pricing = {
-            'gpt-4': {'input': 0.03, 'output': 0.06},
-            'gpt-4-turbo': {'input': 0.01, 'output': 0.03},
-            'gpt-3.5-turbo': {'input': 0.0005, 'output': 0.0015},
-            'claude-3-opus': {'input': 0.015, 'output': 0.075},
-            'claude-3-sonnet': {'input': 0.003, 'output': 0.015},
-        }
-
-        model_pricing = pricing.get(model, pricing['gpt-4'])
-        input_cost = (input_tokens / 1000) * model_pricing['input']
-        output_cost = (output_tokens / 1000) * model_pricing['output']
+        input_price, output_price = _PRICING.get(model, _DEFAULT_PRICING)
+        input_cost = (input_tokens / 1000) * input_price
+        output_cost = (output_tokens / 1000) * output_price
 
         return input_cost + output_cost
 
@@ -297,21 +463,27 @@ class PromptOptimizer:
         """Generate an optimized version of the prompt"""
         optimized = original
 
-        # Apply simple optimizations based on issues
-        high_severity = [i for i in issues if i.severity == Severity.HIGH]
+        # Apply simple optimizations based on issues (one pass to bucket them)
+        types = set()
+        high_severity_types = set()
+        for issue in issues:
+            types.add(issue.type)
+            if issue.severity == Severity.HIGH:
+                high_severity_types.add(issue.type)
 
-        if any(i.type == IssueType.LENGTH for i in high_severity):
+        if IssueType.LENGTH in high_severity_types:
             # Too short - add structure
             optimized = f"Task: {optimized}\n\nRequirements:\n- Provide detailed explanation\n- Use clear examples\n- Format as markdown"
 
-        if any(i.type == IssueType.STRUCTURE for i in issues):
+        if IssueType.STRUCTURE in types:
             # Add clear structure
             if not optimized.startswith(('Generate', 'Write', 'Create', 'Task:')):
                 optimized = f"Generate: {optimized}"
 
-        if any(i.type == IssueType.SPECIFICITY for i in issues):
+        if IssueType.SPECIFICITY in types:
             # Add length spec if missing
-            if 'word' not in optimized.lower() and 'sentence' not in optimized.lower():
+            optimized_lower = optimized.lower()
+            if 'word' not in optimized_lower and 'sentence' not in optimized_lower:
                 optimized += "\n\nLength: Approximately 200 words"
 
         return optimized
@@ -2,21 +2,73 @@
 Prompt template library for testing and comparison
 """
 
-from typing import Dict, List
-from dataclasses import dataclass
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Tuple
+from dataclasses import dataclass, field
 
+# A {{name}} placeholder in template text
+_PLACEHOLDER_RE = re.compile(r"\{\{(\w+)\}\}")
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class PromptTemplate:
-    """Single prompt template"""
+    """
+    Single prompt template
+
+    Hashable: the hash covers the text fields; variables and example_values
+    (a list and a dict) still take part in equality but not in the hash.
+    """
     id: str
     name: str
     description: str
     template: str
-    variables: List[str]
+    variables: List[str] = field(hash=False)
     system_prompt: str
     category: str
-    example_values: Dict[str, str]
+    example_values: Dict[str, str] = field(hash=False)
+    # template as a str.format_map pattern, built once (see _compile_template)
+    _compiled: str = field(init=False, repr=False, compare=False)
+    # variables as a set, for membership tests (the list keeps display order)
+    variables_set: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    # Every {{name}} in template, declared or not
+    _placeholders: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    # template rendered with example_values (templates are immutable, so render once)
+    example_rendered: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "variables_set", frozenset(self.variables))
+        object.__setattr__(self, "_compiled", _compile_template(self.template, self.variables))
+        object.__setattr__(self, "_placeholders", frozenset(_PLACEHOLDER_RE.findall(self.template)))
+        object.__setattr__(self, "example_rendered", self._compiled.format_map(_ShowMissing(self.example_values)))
+
+
+def _compile_template(template: str, variables: List[str]) -> str:
+    """
+    Turn {{var}} placeholders into str.format fields
+
+    Every other brace (including {{name}} for undeclared names) is escaped,
+    so it renders literally.
+
+    Raises:
+        ValueError: If a variable isn't an identifier (str.format would read
+            "a.b" or "a[0]" as attribute/index lookups)
+    """
+    invalid = [var for var in variables if not var.isidentifier()]
+    if invalid:
+        raise ValueError(f"Invalid template variable name(s): {', '.join(invalid)}")
+
+    compiled = template.replace("{", "{{").replace("}", "}}")
+    for var in variables:
+        compiled = compiled.replace(f"{{{{{{{{{var}}}}}}}}}", f"{{{var}}}")
+    return compiled
+
+
+class _ShowMissing(dict):
+    """format_map values that render missing variables as [name]"""
+
+    def __missing__(self, key: str) -> str:
+        return f"[{key}]"
 
 
 # Template library
@@ -167,6 +219,48 @@ TEMPLATES = {
 }
 
 
+def _validate_library(templates: Dict[str, PromptTemplate]):
+    """
+    Check the library's invariants once, at import
+
+    Raises:
+        ValueError: On an empty required field, a key that isn't the
+            template's id, an undeclared placeholder, or a variable
+            without an example value
+    """
+    problems = []
+    for key, template in templates.items():
+        if key != template.id:
+            problems.append(f"{key}: registered under a different id ({template.id})")
+        for name in ("name", "template", "category"):
+            if not getattr(template, name):
+                problems.append(f"{key}: empty {name}")
+        for placeholder in sorted(template._placeholders - template.variables_set):
+            problems.append(f"{key}: placeholder {{{{{placeholder}}}}} not in variables")
+        for variable in template.variables:
+            if variable not in template.example_values:
+                problems.append(f"{key}: no example value for {variable}")
+
+    if problems:
+        raise ValueError("Invalid template library: " + "; ".join(problems))
+
+
+_validate_library(TEMPLATES)
+
+
+def _index_by_category(templates: Dict[str, PromptTemplate]) -> Dict[str, Tuple[PromptTemplate, ...]]:
+    """Group templates by category, preserving library order"""
+    index: Dict[str, List[PromptTemplate]] = {}
+    for template in templates.values():
+        index.setdefault(template.category, []).append(template)
+    return {category: tuple(group) for category, group in index.items()}
+
+
+# Category index, built once (the template library is static)
+TEMPLATES_BY_CATEGORY = _index_by_category(TEMPLATES)
+_CATEGORIES: Tuple[str, ...] = tuple(TEMPLATES_BY_CATEGORY)
+
+
 def render_template(template: PromptTemplate, values: Dict[str, str]) -> str:
     """
     Render a template with provided values
@@ -178,14 +272,19 @@ def render_template(template: PromptTemplate, values: Dict[str, str]) -> str:
     Returns:
         Rendered prompt string
     """
-    prompt = template.template
+    try:
+        items = frozenset(values.items())
+    except TypeError:
+        # Unhashable values can't be memoized
+        return template._compiled.format_map(_ShowMissing(values))
+    return _render_compiled(template._compiled, items)
 
-    for var in template.variables:
-        placeholder = f"{{{{{var}}}}}"
-        value = values.get(var, f"[{var}]")
-        prompt = prompt.replace(placeholder, value)
 
-    return prompt
+@lru_cache(maxsize=1024)
+def _render_compiled(compiled: str, items: FrozenSet[Tuple[str, str]]) -> str:
+    """Render a compiled template, memoized (the same examples get re-rendered a lot)"""
+    # Single pass; values are inserted verbatim, never re-expanded
+    return compiled.format_map(_ShowMissing(items))
 
 
 def get_template(template_id: str) -> PromptTemplate:
@@ -197,9 +296,9 @@ def get_template(template_id: str) -> PromptTemplate:
 
 def get_templates_by_category(category: str) -> List[PromptTemplate]:
     """Get all templates in a category"""
-    return [t for t in TEMPLATES.values() if t.category == category]
+    return list(TEMPLATES_BY_CATEGORY.get(category, ()))
 
 
 def get_all_categories() -> List[str]:
     """Get all unique categories"""
-    return list(set(t.category for t in TEMPLATES.values()))
+    return list(_CATEGORIES)
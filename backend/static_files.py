@@ -0,0 +1,75 @@
+"""
+In-memory static file serving for the frontend
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Dict, NamedTuple
+
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+# Fingerprinted assets (e.g. app.3f9a1c2b.js) never change under their name
+_HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.\w+$")
+
+
+class _CachedFile(NamedTuple):
+    """A static file's bytes plus the headers served with it"""
+    content: bytes
+    media_type: str
+    headers: Dict[str, str]
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles that reads every file once, at startup, and serves from memory
+
+    GET requests for known files skip the per-request stat/open/read and
+    get an ETag (304 on If-None-Match). Fingerprinted assets are marked
+    immutable; everything else revalidates. Anything not cached (HEAD,
+    unknown paths) goes through the regular StaticFiles handling. Files
+    changed after startup are only picked up on restart.
+    """
+
+    def __init__(self, *, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self._files = self._load(Path(directory))
+
+    @staticmethod
+    def _load(directory: Path) -> Dict[str, _CachedFile]:
+        """Read all files under directory, keyed like StaticFiles.get_path"""
+        files: Dict[str, _CachedFile] = {}
+        for path in directory.rglob("*"):
+            if not path.is_file():
+                continue
+
+            content = path.read_bytes()
+            media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            cache_control = (
+                "public, max-age=31536000, immutable"
+                if _HASHED_NAME.search(path.name) else "no-cache"
+            )
+            headers = {
+                "etag": f'"{hashlib.blake2b(content, digest_size=8).hexdigest()}"',
+                "cache-control": cache_control,
+            }
+            key = os.path.normpath(path.relative_to(directory))
+            files[key] = _CachedFile(content, media_type, headers)
+        return files
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        """Serve path from memory when possible, else defer to StaticFiles"""
+        cached = self._files.get(path)
+        if cached is None or scope["method"] != "GET":
+            return await super().get_response(path, scope)
+
+        etag = cached.headers["etag"]
+        for name, value in scope["headers"]:
+            if name == b"if-none-match" and etag.encode() in value:
+                return Response(status_code=304, headers=cached.headers)
+
+        return Response(content=cached.content, media_type=cached.media_type, headers=cached.headers)
@@ -0,0 +1,78 @@
+"""
+Shared pytest fixtures
+"""
+
+import asyncio
+from typing import Dict, List, Tuple
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+from prompts.templates import get_template
+
+
+@pytest.fixture(scope="session")
+def client():
+    """One TestClient for the session; startup/shutdown run exactly once"""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+class FakeProvider:
+    """LLM provider stand-in that records its calls"""
+
+    def __init__(self, name: str, calls: List[Tuple[str, str, Dict]], model: str = "fake-model",
+                 response: str = None, chunks: List[str] = None, delay: float = 0.0):
+        self.name = name
+        self.calls = calls
+        self.model = model
+        self.response = f"answer from {name}" if response is None else response
+        self.chunks = [self.response] if chunks is None else chunks
+        self.delay = delay
+
+    def get_model_name(self):
+        return self.model
+
+    async def generate(self, prompt, **kwargs):
+        self.calls.append(("generate", self.name, kwargs))
+        await asyncio.sleep(self.delay)
+        return self.response
+
+    async def generate_stream(self, prompt, **kwargs):
+        self.calls.append(("stream", self.name, kwargs))
+        await asyncio.sleep(self.delay)
+        for chunk in self.chunks:
+            yield chunk
+
+
+class FakeProviders:
+    """Per-name FakeProvider options plus the calls every fake received"""
+
+    def __init__(self):
+        self.calls: List[Tuple[str, str, Dict]] = []  # (method, provider, kwargs)
+        self._options: Dict[str, Dict] = {}
+
+    def set(self, name: str, **options):
+        """Configure the fake for one provider (see FakeProvider)"""
+        self._options[name] = options
+
+    def get_provider(self, provider_name: str, *args, **kwargs) -> FakeProvider:
+        return FakeProvider(provider_name, self.calls, **self._options.get(provider_name, {}))
+
+
+@pytest.fixture
+def fake_providers(monkeypatch):
+    """Route main.get_provider to FakeProviders, with an empty response cache"""
+    fakes = FakeProviders()
+    monkeypatch.setattr(main, "get_provider", fakes.get_provider)
+    main.response_cache.clear()
+    yield fakes
+    main.response_cache.clear()
+
+
+@pytest.fixture(scope="session")
+def code_gen_template():
+    """The code_generation template, shared by rendering tests (templates are immutable)"""
+    return get_template("code_generation")
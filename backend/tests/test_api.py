@@ -3,19 +3,9 @@ Tests for Prompt Playground API endpoints
 """
 
 import pytest
-from fastapi.testclient import TestClient
 
-# Import main app
-import sys
-from pathlib import Path
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from main import app
-
-client = TestClient(app)
-
-
-def test_health_check():
+def test_health_check(client):
     """Test health check endpoint"""
     response = client.get("/api/")
     assert response.status_code == 200
@@ -24,7 +14,7 @@ def test_health_check():
     assert data["service"] == "Prompt Playground"
 
 
-def test_health_detailed():
+def test_health_detailed(client):
     """Test detailed health endpoint"""
     response = client.get("/health")
     assert response.status_code == 200
@@ -34,7 +24,15 @@ def test_health_detailed():
     assert data["templates_available"] > 0
 
 
-def test_get_templates():
+def test_security_headers(client):
+    """Test security headers are set on responses"""
+    response = client.get("/api/")
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert response.headers["x-frame-options"] == "DENY"
+    assert response.headers["strict-transport-security"].startswith("max-age=")
+
+
+def test_get_templates(client):
     """Test getting all templates"""
     response = client.get("/api/templates")
     assert response.status_code == 200
@@ -50,7 +48,22 @@ def test_get_templates():
     assert "variables" in template
 
 
-def test_get_template_by_id():
+def test_static_listings_support_etag(client):
+    """Test static listings send an ETag and answer 304 when it matches"""
+    for path in ("/api/templates", "/api/categories", "/api/pricing"):
+        response = client.get(path)
+        etag = response.headers["etag"]
+
+        cached = client.get(path, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        stale = client.get(path, headers={"If-None-Match": '"stale"'})
+        assert stale.status_code == 200
+        assert stale.content == response.content
+
+
+def test_get_template_by_id(client):
     """Test getting specific template"""
     response = client.get("/api/templates/code_generation")
     assert response.status_code == 200
@@ -59,15 +72,16 @@ def test_get_template_by_id():
     assert "name" in template
     assert "template" in template
     assert "variables" in template
+    assert "fibonacci" in template["example_rendered"]
 
 
-def test_get_template_not_found():
+def test_get_template_not_found(client):
     """Test getting non-existent template"""
     response = client.get("/api/templates/nonexistent")
     assert response.status_code == 404
 
 
-def test_get_templates_by_category():
+def test_get_templates_by_category(client):
     """Test getting templates by category"""
     response = client.get("/api/templates/category/coding")
     assert response.status_code == 200
@@ -81,7 +95,7 @@ def test_get_templates_by_category():
         assert "name" in template
 
 
-def test_get_categories():
+def test_get_categories(client):
     """Test getting all categories"""
     response = client.get("/api/categories")
     assert response.status_code == 200
@@ -91,7 +105,7 @@ def test_get_categories():
     assert "creative" in categories
 
 
-def test_render_template():
+def test_render_template(client):
     """Test rendering a template"""
     request = {
         "template_id": "code_generation",
@@ -108,7 +122,7 @@ def test_render_template():
     assert "fibonacci" in data["rendered_prompt"]
 
 
-def test_render_template_not_found():
+def test_render_template_not_found(client):
     """Test rendering non-existent template"""
     request = {
         "template_id": "nonexistent",
@@ -118,7 +132,7 @@ def test_render_template_not_found():
     assert response.status_code == 404
 
 
-def test_get_pricing():
+def test_get_pricing(client):
     """Test getting pricing information"""
     response = client.get("/api/pricing")
     assert response.status_code == 200
@@ -129,7 +143,7 @@ def test_get_pricing():
     assert "output_per_1k" in pricing["gpt-4"]
 
 
-def test_get_metrics():
+def test_get_metrics(client):
     """Test getting metrics"""
     response = client.get("/metrics")
     assert response.status_code == 200
@@ -138,7 +152,17 @@ def test_get_metrics():
     assert "total_requests" in metrics
 
 
-def test_compare_validation():
+def test_metrics_include_optimizer_cache(client):
+    """Test /metrics reports the optimizer memo"""
+    client.post("/api/optimize", json={"prompt": "Write a limerick"})
+    client.post("/api/optimize", json={"prompt": "Write a limerick"})
+
+    optimizer_cache = client.get("/metrics").json()["optimizer_cache"]
+    assert optimizer_cache["hits"] >= 1
+    assert optimizer_cache["size"] >= 1
+
+
+def test_compare_validation(client):
     """Test compare endpoint validation"""
     # Missing prompt
     response = client.post("/api/compare", json={
@@ -154,7 +178,172 @@ def test_compare_validation():
     # This might return 422 or 500 depending on validation
 
 
-def test_frontend_serving():
+def test_compare_rejects_unknown_provider(client):
+    """Test unknown providers fail fast with 400"""
+    response = client.post("/api/compare", json={
+        "prompt": "test",
+        "providers": ["openai", "bogus"]
+    })
+    assert response.status_code == 400
+    assert "bogus" in response.json()["detail"]
+
+
+def test_compare_dedupes_providers(client, fake_providers):
+    """Test duplicate providers are only queried once"""
+    response = client.post("/api/compare", json={
+        "prompt": "test",
+        "providers": ["openai", "OpenAI", "anthropic", "openai"]
+    })
+    assert response.status_code == 200
+    assert [provider for _, provider, _ in fake_providers.calls] == ["openai", "anthropic"]
+    assert [r["provider"] for r in response.json()["results"]] == ["openai", "anthropic"]
+
+
+def test_compare_stream_ndjson(client, fake_providers):
+    """Test streaming compare emits deltas, per-provider results and a summary"""
+    import json
+    import main
+
+    fake_providers.set("openai", chunks=["Hello", " ", "world"])
+
+    response = client.post("/api/compare/stream", json={
+        "prompt": "stream test",
+        "providers": ["openai"]
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    deltas = [e["delta"] for e in events if "delta" in e]
+    assert "".join(deltas) == "Hello world"
+    assert events[-2]["result"]["response"] == "Hello world"
+    assert events[-1]["fastest"] == "openai"
+
+    # The accumulated response was cached
+    assert main.response_cache.get("stream test", "openai", "fake-model") is not None
+
+
+def test_stream_joins_in_flight_compare(client, fake_providers):
+    """Test a stream racing an identical compare shares its LLM call"""
+    import asyncio
+    import main
+
+    fake_providers.set("openai", response="shared answer", delay=0.05)
+
+    compare_request = main.CompareRequest(prompt="race test", providers=["openai"])
+    prompt_hash = main.response_cache.prompt_hash(compare_request.prompt, compare_request.system_prompt)
+
+    async def run():
+        events = asyncio.Queue()
+        results = await asyncio.gather(
+            main._compare_provider("openai", compare_request, {}, prompt_hash),
+            main._stream_provider("openai", compare_request, {}, prompt_hash, events),
+        )
+        return results, [events.get_nowait() for _ in range(events.qsize())]
+
+    (compared, streamed), events = asyncio.run(run())
+
+    assert [method for method, _, _ in fake_providers.calls] == ["generate"]
+    assert (compared.cached, streamed.cached) == (False, True)
+    assert events[0] == {"provider": "openai", "delta": "shared answer"}
+    assert events[-1]["result"]["response"] == "shared answer"
+
+
+def test_compare_stream_flag(client, fake_providers):
+    """Test stream=true emits the stream endpoint's result events (no deltas), then a summary"""
+    import json
+
+    # anthropic finishes last
+    fake_providers.set("openai", delay=0.01)
+    fake_providers.set("anthropic", delay=0.05)
+
+    response = client.post("/api/compare", json={
+        "prompt": "stream flag test",
+        "providers": ["openai", "anthropic"],
+        "stream": True,
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert not any("delta" in line for line in lines)
+    assert [line["provider"] for line in lines[:-1]] == ["openai", "anthropic"]
+    assert lines[0]["result"]["response"] == "answer from openai"
+    assert lines[-1]["fastest"] == "openai"
+
+
+def test_compare_passes_request_params_to_shared_provider(client, fake_providers):
+    """Test per-request model/temperature go to generate, not the provider instance"""
+    fake_providers.set("openai", model="default-model")
+
+    response = client.post("/api/compare", json={
+        "prompt": "param test",
+        "providers": ["openai"],
+        "models": {"openai": "gpt-3.5-turbo"},
+        "temperature": 0.2,
+        "max_tokens": 50,
+    })
+    assert response.status_code == 200
+    assert response.json()["results"][0]["model"] == "gpt-3.5-turbo"
+    _, _, kwargs = fake_providers.calls[0]
+    assert kwargs["model"] == "gpt-3.5-turbo"
+    assert kwargs["temperature"] == 0.2
+    assert kwargs["max_tokens"] == 50
+
+
+def test_compare_matches_models_to_mixed_case_providers(client, fake_providers):
+    """Test a model keyed by a mixed-case provider name still applies"""
+    response = client.post("/api/compare", json={
+        "prompt": "mixed case model test",
+        "providers": ["OpenAI"],
+        "models": {"OpenAI": "gpt-4o"},
+    })
+    assert response.status_code == 200
+    assert response.json()["results"][0]["model"] == "gpt-4o"
+    _, provider, kwargs = fake_providers.calls[0]
+    assert (provider, kwargs["model"]) == ("openai", "gpt-4o")
+
+
+def test_providers_survive_a_second_lifespan(monkeypatch):
+    """Test shutdown drops cached providers along with their closed HTTP clients"""
+    from fastapi.testclient import TestClient
+    from llm import providers
+    import main
+
+    class FakeProvider:
+        def __init__(self, provider_name):
+            self.client = providers.get_http_client(provider_name)
+
+    monkeypatch.setattr(providers, "create_provider", FakeProvider)
+    providers.get_provider.cache_clear()
+
+    seen = []
+    for _ in range(2):
+        with TestClient(main.app):
+            provider = providers.get_provider("openai")
+            assert not provider.client.is_closed
+            seen.append(provider)
+
+    assert seen[0] is not seen[1]
+    assert seen[0].client.is_closed
+    assert providers.get_provider.cache_info().currsize == 0
+
+
+def test_optimize_batch(client):
+    """Test batch optimize returns one result per prompt and enforces limits"""
+    response = client.post("/api/optimize/batch", json={
+        "prompts": ["Write something about AI", "Maybe explain it"],
+        "model": "gpt-4",
+    })
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 2
+    assert all("score" in r and "issues" in r for r in results)
+
+    assert client.post("/api/optimize/batch", json={"prompts": []}).status_code == 422
+
+
+def test_frontend_serving(client):
     """Test frontend is served"""
     response = client.get("/")
     assert response.status_code == 200
@@ -162,12 +351,24 @@ def test_frontend_serving():
     assert "text/html" in response.headers["content-type"].lower()
 
 
-def test_static_files():
+def test_static_files(client):
     """Test static files are accessible"""
     # Try to access CSS
     response = client.get("/static/css/styles.css")
     assert response.status_code == 200
 
 
+def test_static_files_served_from_memory(client):
+    """Test cached static files carry an ETag, revalidate with 304, and 404 unknown paths"""
+    response = client.get("/static/css/styles.css")
+    assert "text/css" in response.headers["content-type"]
+    assert response.headers["cache-control"] == "no-cache"
+
+    cached = client.get("/static/css/styles.css", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+
+    assert client.get("/static/css/missing.css").status_code == 404
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -2,9 +2,22 @@
 Tests for response caching
 """
 
+import asyncio
 import pytest
-import time
-from cache import ResponseCache, CachedResponse
+from cache import ResponseCache, CachedResponse, SemanticIndex
+
+
+class FakeClock:
+    """Manually advanced stand-in for time.time"""
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
 
 
 class TestResponseCache:
@@ -12,8 +25,8 @@ class TestResponseCache:
 
     @pytest.fixture
     def cache(self):
-        """Create cache with short TTL for testing"""
-        return ResponseCache(max_size=10, ttl_seconds=2)
+        """Create cache with short TTL (and a fake clock) for testing"""
+        return ResponseCache(max_size=10, ttl_seconds=2, clock=FakeClock())
 
     def test_cache_put_and_get(self, cache):
         """Test basic put and get"""
@@ -124,7 +137,7 @@ class TestResponseCache:
         assert cached is not None
 
         # Wait for expiration
-        time.sleep(2.1)
+        cache._clock.advance(2.1)
 
         # Should be expired
         cached = cache.get("test", "openai", "gpt-4")
@@ -168,6 +181,41 @@ class TestResponseCache:
         assert cache.get("prompt2", "openai", "gpt-4") is not None
         assert cache.get("prompt3", "openai", "gpt-4") is not None
 
+    def test_cache_admission_protects_hot_entries(self):
+        """Test TinyLFU admission keeps frequently requested entries"""
+        cache = ResponseCache(max_size=2, ttl_seconds=100)
+
+        for i in range(2):
+            cache.put(
+                prompt=f"hot{i}",
+                provider="openai",
+                model="gpt-4",
+                response=f"response{i}",
+                input_tokens=5,
+                output_tokens=10,
+                cost=0.01,
+                latency=0.1,
+            )
+            for _ in range(3):
+                cache.get(f"hot{i}", "openai", "gpt-4")
+
+        # A never-requested prompt should not displace a hot one
+        cache.put(
+            prompt="cold",
+            provider="openai",
+            model="gpt-4",
+            response="cold response",
+            input_tokens=5,
+            output_tokens=10,
+            cost=0.01,
+            latency=0.1,
+        )
+
+        assert len(cache.cache) == 2
+        assert cache.rejections == 1
+        assert cache.get("hot0", "openai", "gpt-4") is not None
+        assert cache.get("hot1", "openai", "gpt-4") is not None
+
     def test_cache_clear(self, cache):
         """Test cache clear"""
         # Add entries
@@ -183,12 +231,11 @@ class TestResponseCache:
                 latency=0.1,
             )
 
-        assert len(cache.cache) == 5
+        assert cache.size == 5
 
         cache.clear()
 
-        assert len(cache.cache) == 0
-        assert len(cache.access_times) == 0
+        assert cache.size == 0
 
     def test_cache_stats(self, cache):
         """Test cache statistics"""
@@ -217,6 +264,33 @@ class TestResponseCache:
         assert stats['misses'] == 1
         assert stats['hit_rate'] == pytest.approx(66.67, rel=0.1)
         assert 'estimated_cost_saved' in stats
+        assert stats['estimated_cost_saved'] == pytest.approx(0.02)
+        assert stats['cached_cost'] == pytest.approx(0.03)
+
+    def test_prompt_hash_matches_full_key(self, cache):
+        """Test a precomputed prompt_hash addresses the same entry"""
+        cache.put("long prompt " * 100, "openai", "gpt-4", "response", 5, 10, 0.01, 0.1)
+
+        prompt_hash = ResponseCache.prompt_hash("long prompt " * 100)
+        cached = cache.get("long prompt " * 100, "openai", "gpt-4", prompt_hash=prompt_hash)
+
+        assert cached is not None
+        assert cached.response == "response"
+
+    def test_temperature_quantized_in_key(self, cache):
+        """Test float jitter in temperature still hits, real differences don't"""
+        cache.put("prompt", "openai", "gpt-4", "response", 5, 10, 0.01, 0.1, temperature=0.7)
+
+        assert cache.get("prompt", "openai", "gpt-4", temperature=0.1 * 7) is not None
+        assert cache.get("prompt", "openai", "gpt-4", temperature=0.8) is None
+
+    def test_precomputed_key(self, cache):
+        """Test make_key output can be passed to get/put directly"""
+        key = cache.make_key("prompt", "openai", "gpt-4")
+        cache.put("prompt", "openai", "gpt-4", "response", 5, 10, 0.01, 0.1, key=key)
+
+        assert cache.get("prompt", "openai", "gpt-4").response == "response"
+        assert cache.get("prompt", "openai", "gpt-4", key=key).response == "response"
 
     def test_cache_system_prompt_differentiation(self, cache):
         """Test that system prompts are distinguished"""
@@ -251,6 +325,56 @@ class TestResponseCache:
         assert cached1.response == "response1"
         assert cached2.response == "response2"
 
+    def test_bulk_put(self, cache):
+        """Test bulk warmup matches individual puts"""
+        entries = [
+            {
+                "prompt": f"prompt{i}",
+                "provider": "openai",
+                "model": "gpt-4",
+                "response": f"response{i}",
+                "input_tokens": 5,
+                "output_tokens": 10,
+                "cost": 0.01,
+                "latency": 0.1,
+            }
+            for i in range(3)
+        ]
+        entries[2]["system_prompt"] = "Be brief"
+        entries.append(dict(entries[0], prompt="stale", timestamp=cache._clock() - 60))
+
+        assert cache.bulk_put(entries) == 3
+        assert cache.get("stale", "openai", "gpt-4") is None
+        assert cache.get("prompt0", "openai", "gpt-4").response == "response0"
+        assert cache.get("prompt2", "openai", "gpt-4") is None
+        assert cache.get("prompt2", "openai", "gpt-4", system_prompt="Be brief").response == "response2"
+        assert cache.get_stats()['cached_cost'] == pytest.approx(0.03)
+
+    def test_bulk_put_accepts_put_keys_and_skips_malformed(self, cache):
+        """Test bulk entries may carry put()'s prompt_hash/key, and bad entries don't abort the batch"""
+        entry = {
+            "prompt": "hashed",
+            "provider": "openai",
+            "model": "gpt-4",
+            "response": "by hash",
+            "input_tokens": 5,
+            "output_tokens": 10,
+            "cost": 0.01,
+            "latency": 0.1,
+        }
+        keyed = dict(entry, prompt="keyed", response="by key")
+        entries = [
+            dict(entry, prompt_hash=cache.prompt_hash("hashed")),
+            {"prompt": "broken", "provider": "openai"},
+            dict(entry, prompt="extra", unexpected=True),
+            dict(keyed, key=cache.make_key("keyed", "openai", "gpt-4")),
+        ]
+
+        assert cache.bulk_put(entries) == 2
+        assert cache.get("hashed", "openai", "gpt-4").response == "by hash"
+        assert cache.get("keyed", "openai", "gpt-4").response == "by key"
+        assert cache.get("extra", "openai", "gpt-4") is None
+
     def test_cleanup_expired(self, cache):
         """Test cleanup of expired entries"""
         # Add entries
@@ -269,10 +393,291 @@ class TestResponseCache:
         assert len(cache.cache) == 3
 
         # Wait for expiration
-        time.sleep(2.1)
+        cache._clock.advance(2.1)
 
         # Cleanup
         removed = cache.cleanup_expired()
 
         assert removed == 3
         assert len(cache.cache) == 0
+
+    def test_cleanup_skips_refreshed_entries(self, cache):
+        """Test stale heap items for re-inserted keys don't expire the fresh entry"""
+
+        for i in range(2):
+            cache.put(
+                prompt="prompt",
+                provider="openai",
+                model="gpt-4",
+                response=f"response{i}",
+                input_tokens=5,
+                output_tokens=10,
+                cost=0.01,
+                latency=0.1,
+            )
+            cache._clock.advance(1.5)
+
+        # First insertion is past due, the refreshed one is not
+        assert cache.cleanup_expired() == 0
+        assert cache.get("prompt", "openai", "gpt-4").response == "response1"
+
+        cache._clock.advance(1.0)
+        assert cache.cleanup_expired() == 1
+        assert len(cache.cache) == 0
+        assert cache._expiry_heap == []
+
+    def test_expiry_heap_stays_bounded(self):
+        """Test churn past capacity compacts stale heap items instead of piling up"""
+        cache = ResponseCache(max_size=2, ttl_seconds=2, clock=FakeClock())
+
+        for i in range(500):
+            cache.put(
+                prompt=f"prompt{i % 3}",
+                provider="openai",
+                model="gpt-4",
+                response=f"response{i}",
+                input_tokens=5,
+                output_tokens=10,
+                cost=0.01,
+                latency=0.1,
+            )
+
+        assert len(cache._expiry_heap) <= 2 * cache.max_size + 64
+        live = cache.size
+        cache._clock.advance(2.1)
+        assert cache.cleanup_expired() == live
+        assert cache._expiry_heap == []
+
+    def test_get_or_compute_coalesces_concurrent_misses(self, cache):
+        """Test concurrent identical misses share a single computation"""
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {
+                "response": "shared",
+                "input_tokens": 5,
+                "output_tokens": 10,
+                "cost": 0.01,
+                "latency": 0.01,
+            }
+
+        async def run():
+            return await asyncio.gather(*(
+                cache.get_or_compute(compute, "test", "openai", "gpt-4")
+                for _ in range(3)
+            ))
+
+        results = asyncio.run(run())
+
+        assert calls == 1
+        assert [cached for _, cached in results] == [False, True, True]
+        assert all(entry.response == "shared" for entry, _ in results)
+        assert cache.coalesced == 2
+
+        # Followers count as hits, so the hit rate and the savings agree
+        stats = cache.get_stats()
+        assert (stats['hits'], stats['misses']) == (2, 1)
+        assert stats['estimated_cost_saved'] == pytest.approx(2 * results[0][0].cost)
+        assert cache.get("test", "openai", "gpt-4").response == "shared"
+
+    @staticmethod
+    def _letter_counts(text):
+        """Toy embedding: letter histogram (ignores punctuation and spacing)"""
+        import numpy as np
+
+        vector = np.zeros(26)
+        for ch in text:
+            if "a" <= ch <= "z":
+                vector[ord(ch) - ord("a")] += 1
+        return vector
+
+    def test_semantic_hit_for_near_duplicate_prompt(self):
+        """Test near-duplicate prompts hit via the semantic index, in context only"""
+        cache = ResponseCache(
+            max_size=10,
+            ttl_seconds=60,
+            semantic=SemanticIndex(threshold=0.95, encode=self._letter_counts),
+        )
+        cache.put(
+            prompt="What is the capital of France?",
+            provider="openai",
+            model="gpt-4",
+            response="Paris",
+            input_tokens=7,
+            output_tokens=1,
+            cost=0.01,
+            latency=0.5,
+        )
+
+        cached = cache.get("what is the  capital of france", "openai", "gpt-4")
+        assert cached is not None
+        assert cached.response == "Paris"
+
+        # Same prompt, different model: never served another model's answer
+        assert cache.get("what is the capital of france", "openai", "gpt-3.5-turbo") is None
+        assert cache.get("Explain quantum tunnelling", "openai", "gpt-4") is None
+
+        stats = cache.get_stats()
+        assert stats['semantic_hits'] == 1
+        assert stats['hits'] == 1
+        assert stats['misses'] == 2
+
+    def test_semantic_index_tracks_evictions(self):
+        """Test evicted entries leave the semantic index"""
+        index = SemanticIndex(encode=self._letter_counts)
+        cache = ResponseCache(max_size=2, ttl_seconds=60, semantic=index)
+
+        for prompt in ("alpha", "bravo", "charlie"):
+            cache.put(prompt, "openai", "gpt-4", prompt.upper(), 1, 1, 0.001, 0.1)
+
+        assert len(index) == len(cache.cache) == 2
+        assert cache.get("ALPHA!", "openai", "gpt-4") is None
+        assert cache.get("Charlie", "openai", "gpt-4").response == "CHARLIE"
+
+    def test_async_semantic_paths_embed_off_the_loop(self):
+        """Test get_async/put_async run the embedding in a worker thread"""
+        import threading
+
+        threads = []
+
+        def encode(text):
+            threads.append(threading.current_thread())
+            return self._letter_counts(text)
+
+        cache = ResponseCache(max_size=10, ttl_seconds=60, semantic=SemanticIndex(encode=encode))
+
+        async def run():
+            await cache.put_async("What is the capital of France?", "openai", "gpt-4", "Paris", 7, 1, 0.01, 0.5)
+            return await cache.get_async("what is the capital of france", "openai", "gpt-4")
+
+        assert asyncio.run(run()).response == "Paris"
+        assert len(threads) == 2
+        assert threading.main_thread() not in threads
+
+    def test_bulk_put_embeds_in_one_batch(self):
+        """Test bulk warmup encodes all admitted prompts in a single call"""
+        batches = []
+
+        def encode_batch(texts):
+            batches.append(texts)
+            return [self._letter_counts(text) for text in texts]
+
+        index = SemanticIndex(encode=self._letter_counts, encode_batch=encode_batch)
+        cache = ResponseCache(max_size=10, ttl_seconds=60, semantic=index)
+
+        cache.bulk_put(
+            {"prompt": prompt, "provider": "openai", "model": "gpt-4", "response": prompt.upper(),
+             "input_tokens": 1, "output_tokens": 1, "cost": 0.001, "latency": 0.1}
+            for prompt in ("Alpha", "Bravo", "Charlie")
+        )
+
+        assert batches == [["alpha", "bravo", "charlie"]]
+        assert cache.get("charlie!", "openai", "gpt-4").response == "CHARLIE"
+
+    def test_shared_store_across_instances(self, tmp_path):
+        """Test caches sharing a directory see each other's entries"""
+        pytest.importorskip("diskcache")
+
+        writer = ResponseCache(max_size=10, ttl_seconds=100, shared_dir=str(tmp_path))
+        reader = ResponseCache(max_size=10, ttl_seconds=100, shared_dir=str(tmp_path))
+
+        writer.put(
+            prompt="shared prompt",
+            provider="openai",
+            model="gpt-4",
+            response="shared response",
+            input_tokens=5,
+            output_tokens=10,
+            cost=0.01,
+            latency=0.1,
+        )
+
+        cached = reader.get("shared prompt", "openai", "gpt-4")
+
+        assert cached is not None
+        assert cached.response == "shared response"
+        assert reader.store_hits == 1
+        assert reader.hits == 1
+
+    def test_busy_store_degrades_to_miss(self, tmp_path):
+        """Test a tier that times out skips writes/clears and reads as a miss instead of raising"""
+        diskcache = pytest.importorskip("diskcache")
+
+        class BusyStore:
+            def get(self, key):
+                raise diskcache.Timeout("database is locked")
+
+            def set(self, key, value, expire=None):
+                raise diskcache.Timeout("database is locked")
+
+            def clear(self):
+                raise diskcache.Timeout("database is locked")
+
+        cache = ResponseCache(max_size=10, ttl_seconds=100, persist_dir=str(tmp_path))
+        cache.stores = [BusyStore()]
+
+        async def compute():
+            return {"response": "generated", "input_tokens": 1, "output_tokens": 1, "cost": 0.01, "latency": 0.1}
+
+        entry, cached = asyncio.run(cache.get_or_compute(compute, "busy prompt", "openai", "gpt-4"))
+        assert (entry.response, cached) == ("generated", False)
+
+        # The write-through was skipped, but the entry is still served from memory
+        assert cache.get("busy prompt", "openai", "gpt-4").response == "generated"
+
+        cache.put("sync prompt", "openai", "gpt-4", "sync", 1, 1, 0.01, 0.1)
+        assert cache.get("other prompt", "openai", "gpt-4") is None
+        assert asyncio.run(cache.get_async("other prompt", "openai", "gpt-4")) is None
+        assert cache.misses == 3
+
+        # Clearing still empties memory when the tier is locked
+        cache.clear()
+        assert cache.size == 0
+        cache.put("sync prompt", "openai", "gpt-4", "sync", 1, 1, 0.01, 0.1)
+        asyncio.run(cache.clear_async())
+        assert cache.size == 0
+
+    def test_async_lookup_reads_shared_store(self, tmp_path):
+        """Test get_async/put_async go through the slower tiers like get/put"""
+        pytest.importorskip("diskcache")
+
+        writer = ResponseCache(max_size=10, ttl_seconds=100, shared_dir=str(tmp_path))
+        reader = ResponseCache(max_size=10, ttl_seconds=100, shared_dir=str(tmp_path))
+
+        asyncio.run(writer.put_async("async prompt", "openai", "gpt-4", "async response", 5, 10, 0.01, 0.1))
+        cached = asyncio.run(reader.get_async("async prompt", "openai", "gpt-4"))
+
+        assert cached.response == "async response"
+        assert reader.store_hits == 1
+        assert reader.hits == 1
+
+    def test_persistent_store_survives_restart(self, tmp_path):
+        """Test entries persisted before a restart are served afterwards"""
+        pytest.importorskip("diskcache")
+
+        before = ResponseCache(max_size=10, ttl_seconds=100, persist_dir=str(tmp_path))
+        before.put(
+            prompt="persisted prompt",
+            provider="anthropic",
+            model="claude-3-haiku",
+            response="persisted response",
+            input_tokens=5,
+            output_tokens=10,
+            cost=0.01,
+            latency=0.1,
+        )
+        before.stores[0].close()
+
+        after = ResponseCache(max_size=10, ttl_seconds=100, persist_dir=str(tmp_path))
+        cached = after.get("persisted prompt", "anthropic", "claude-3-haiku")
+
+        assert cached is not None
+        assert cached.response == "persisted response"
+        assert after.store_hits == 1
+
+        # Promoted into memory: the next hit doesn't touch disk
+        after.get("persisted prompt", "anthropic", "claude-3-haiku")
+        assert after.store_hits == 1
@@ -4,15 +4,11 @@ Tests for cost calculation
 
 import pytest
 
-# Import modules
-import sys
-from pathlib import Path
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from prompts.cost import (
     PRICING,
     calculate_cost,
     estimate_tokens,
+    tokenizer_key,
     get_cost_breakdown,
 )
 
@@ -31,6 +27,14 @@ def test_pricing_data():
         assert pricing["context_window"] > 0
 
 
+def test_pricing_read_only():
+    """Test pricing can't be mutated out from under the per-token tables"""
+    with pytest.raises(TypeError):
+        PRICING["gpt-4"] = {"input": 0, "output": 0, "context_window": 1}
+    with pytest.raises(TypeError):
+        PRICING["gpt-4"]["input"] = 0
+
+
 def test_calculate_cost_gpt4():
     """Test cost calculation for GPT-4"""
     # 1000 input tokens, 500 output tokens
@@ -84,6 +88,14 @@ def test_estimate_tokens_long():
     assert tokens < 2000
 
 
+def test_tokenizer_key_groups_equal_estimates():
+    """Test models sharing a tokenizer key get identical estimates"""
+    text = "Shared prompt text for every provider."
+    assert tokenizer_key("claude-3-opus") == tokenizer_key("claude-3-haiku")
+    assert estimate_tokens(text, "claude-3-opus") == estimate_tokens(text, "claude-3-haiku")
+    assert tokenizer_key("gpt-4") != tokenizer_key("claude-3-opus")
+
+
 def test_get_cost_breakdown():
     """Test cost breakdown"""
     breakdown = get_cost_breakdown("gpt-4", 1000, 500)
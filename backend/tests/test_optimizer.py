@@ -0,0 +1,199 @@
+"""
+Tests for prompt optimizer
+"""
+
+import pytest
+
+from prompts.optimizer import (
+    PromptOptimizer,
+    IssueType,
+    Severity,
+    _scan_keywords,
+)
+
+
+def issue_messages(result):
+    """Messages of every issue found"""
+    return [issue.message for issue in result.issues]
+
+
+def test_scan_keywords():
+    """Test keywords are grouped by category, shared ones in each"""
+    found = _scan_keywords("please write something in json, maybe")
+
+    assert found["task"] == {"please", "write"}
+    assert found["polite"] == {"please"}
+    assert found["generic"] == {"something"}
+    assert found["format"] == {"json"}
+    assert found["vague"] == {"maybe"}
+    assert found["example"] == set()
+
+
+def test_scan_keywords_whole_words():
+    """Test word keywords ignore longer words but substring ones don't"""
+    found = _scan_keywords("a mightily handsome, kindly offer; see the examples, formatted")
+
+    assert found["vague"] == set()
+    assert found["generic"] == set()
+    assert found["polite"] == {"kindly"}
+    assert found["example"] == {"example"}
+    assert found["format"] == {"format"}
+
+
+@pytest.mark.parametrize("text", [
+    "creates a summary", "created a summary", "creating a summary", "recreate the chart",
+    "writes a poem", "writing a poem", "rewrite the intro", "rewrites the intro",
+    "generates tests", "generating tests", "generated tests", "regenerate the table",
+])
+def test_scan_keywords_inflected_task_verbs(text):
+    """Test task verbs count in inflected and re- forms"""
+    assert _scan_keywords(text)["task"]
+
+
+@pytest.mark.parametrize("text", ["the writer", "a creative idea", "a writ of habeas corpus", "generator output"])
+def test_scan_keywords_task_verbs_not_inside_other_words(text):
+    """Test task verbs don't match as parts of other words"""
+    assert _scan_keywords(text)["task"] == set()
+
+
+def test_inflected_task_verb_is_a_task_instruction():
+    """Test a prompt opening with an inflected verb isn't flagged as missing a task"""
+    result = PromptOptimizer().analyze("Creates a summary of the attached report")
+
+    assert "No clear task instruction found" not in issue_messages(result)
+
+
+def test_analyze_short_vague_prompt():
+    """Test a short, vague prompt is flagged and rewritten"""
+    result = PromptOptimizer().analyze("Maybe write something about AI")
+
+    types = {issue.type for issue in result.issues}
+    assert IssueType.LENGTH in types
+    assert IssueType.CLARITY in types
+    assert IssueType.SPECIFICITY in types
+    assert result.score < 100
+    assert result.optimized_prompt.startswith("Task: ")
+
+
+def test_analyze_well_formed_prompt():
+    """Test a specific, structured prompt has no issues"""
+    prompt = (
+        "Your task is to write a summary of the attached quarterly report for executives. "
+        "Format the answer as JSON with keys summary and risks. Use under 150 words. "
+        "For example: {\"summary\": \"...\", \"risks\": [\"...\"]}"
+    )
+    result = PromptOptimizer().analyze(prompt)
+
+    assert result.issues == []
+    assert result.score == 100
+    assert result.optimized_prompt is None
+
+
+def test_analyze_case_insensitive_keywords():
+    """Test keyword checks ignore case"""
+    result = PromptOptimizer().analyze("GENERATE a list, PERHAPS")
+
+    assert "Prompt contains vague language" in issue_messages(result)
+    assert "No clear task instruction found" not in issue_messages(result)
+
+
+def test_excessive_politeness():
+    """Test three distinct polite phrases in a long prompt are flagged"""
+    prompt = "Please kindly, if you could, summarize the quarterly numbers. " + "revenue grew " * 400
+    result = PromptOptimizer().analyze(prompt)
+
+    assert "Excessive politeness adds tokens" in issue_messages(result)
+
+
+def test_redundant_sentences():
+    """Test repeated sentence openings are flagged as redundant"""
+    prompt = "Describe the deployment pipeline in detail. " * 6
+    result = PromptOptimizer().analyze(prompt)
+
+    redundant = [i for i in result.issues if i.message == "Prompt may contain redundant information"]
+    assert len(redundant) == 1
+    assert redundant[0].severity == Severity.LOW
+
+
+def test_estimated_cost_uses_model_pricing():
+    """Test cost uses the model's rates and falls back to gpt-4"""
+    optimizer = PromptOptimizer()
+    prompt = "Write a haiku about autumn leaves falling"
+
+    gpt4 = optimizer.analyze(prompt, model="gpt-4", target_output_length=500)
+    unknown = optimizer.analyze(prompt, model="unknown-model", target_output_length=500)
+    haiku = optimizer.analyze(prompt, model="gpt-3.5-turbo", target_output_length=500)
+
+    assert gpt4.estimated_cost == pytest.approx(unknown.estimated_cost)
+    assert haiku.estimated_cost < gpt4.estimated_cost
+
+
+def test_heuristic_estimation_mode():
+    """Test heuristic mode counts ~4 chars per token and bad modes are rejected"""
+    optimizer = PromptOptimizer(estimation_mode="heuristic")
+    assert optimizer.analyze("a" * 400).token_count == 100
+    assert optimizer.analyze("").token_count == 1
+
+    with pytest.raises(ValueError, match="exact"):
+        PromptOptimizer(estimation_mode="exact")
+
+
+def test_analyze_memoized():
+    """Test repeat analysis is served from the memo without sharing issue lists"""
+    optimizer = PromptOptimizer()
+    prompt = "Maybe write something about AI"
+
+    first = optimizer.analyze(prompt)
+    first.issues.clear()
+    second = optimizer.analyze(prompt)
+
+    assert second.issues
+    assert optimizer._analyze_cached.cache_info().hits == 1
+
+    # Different arguments are separate entries
+    optimizer.analyze(prompt, model="claude-3-opus")
+    assert optimizer._analyze_cached.cache_info().currsize == 2
+
+
+def test_analyze_batch_tokenizes_in_one_call(monkeypatch):
+    """Test a tiktoken-mode batch counts its distinct prompts in a single tokenizer call"""
+    from prompts import optimizer as optimizer_module
+
+    batches = []
+
+    def fake_batch(texts, model="gpt-4"):
+        batches.append(list(texts))
+        return [len(text) for text in texts]
+
+    def no_single_calls(text, model="gpt-4"):
+        raise AssertionError("tokenized outside the batch")
+
+    monkeypatch.setattr(optimizer_module, "estimate_tokens_batch", fake_batch)
+    monkeypatch.setattr(optimizer_module, "estimate_tokens", no_single_calls)
+
+    optimizer = PromptOptimizer()
+    prompts = ["Maybe write something", "List 3 colors", "Maybe write something"]
+    results = optimizer.analyze_batch(prompts)
+
+    assert batches == [["Maybe write something", "List 3 colors"]]
+    assert [r.token_count for r in results] == [len(p) for p in prompts]
+    assert optimizer._batch_tokens.counts is None
+
+    stats = optimizer.get_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["max_size"] == 4096
+
+    optimizer.clear_cache()
+    assert optimizer._analyze_cached.cache_info().currsize == 0
+
+
+def test_analyze_batch():
+    """Test batch analysis keeps order and analyzes repeated prompts once"""
+    optimizer = PromptOptimizer()
+    prompts = ["Maybe write something", "Your task is to list 3 colors", "Maybe write something"]
+
+    results = optimizer.analyze_batch(prompts, model="gpt-4")
+
+    assert [r.score for r in results] == [optimizer.analyze(p).score for p in prompts]
+    assert optimizer._analyze_cached.cache_info().currsize == 2
@@ -18,6 +18,9 @@ from prompts.cost import (
     PRICING,
     calculate_cost,
     estimate_tokens,
+    estimate_tokens_batch,
+    _get_encoding,
+    warm_encodings,
     format_cost,
     get_cost_breakdown,
     compare_costs,
@@ -186,53 +189,42 @@ class TestTemplateRetrieval:
 
         assert len(categories) == len(set(categories))
 
+    def test_category_index_matches_scan(self):
+        """Category lookups should match a full scan of the library"""
+        for category in get_all_categories():
+            expected = [t for t in TEMPLATES.values() if t.category == category]
+            assert get_templates_by_category(category) == expected
+
+        assert get_templates_by_category("no-such-category") == []
+
 
 # ============================================================================
 # Cost Calculation Tests
 # ============================================================================
 
-class TestCostCalculation:
-    """Test LLM cost calculation"""
-
-    def test_calculate_gpt4_cost(self):
-        """Should calculate GPT-4 cost correctly"""
-        cost = calculate_cost("gpt-4", input_tokens=1000, output_tokens=500)
-
-        # $0.03/1K input + $0.06/1K output
-        # 1000 tokens * $0.03/1000 = $0.03
-        # 500 tokens * $0.06/1000 = $0.03
-        # Total = $0.06
-        assert cost == pytest.approx(0.06, 0.0001)
-
-    def test_calculate_gpt35_cost(self):
-        """Should calculate GPT-3.5 cost correctly"""
-        cost = calculate_cost("gpt-3.5-turbo", input_tokens=1000, output_tokens=1000)
-
-        # $0.0005/1K input + $0.0015/1K output
-        # 1000 * $0.0005/1000 = $0.0005
-        # 1000 * $0.0015/1000 = $0.0015
-        # Total = $0.002
-        assert cost == pytest.approx(0.002, 0.0001)
-
-    def test_calculate_claude_cost(self):
-        """Should calculate Claude cost correctly"""
-        cost = calculate_cost("claude-3-5-sonnet-20241022", input_tokens=1000, output_tokens=1000)
-
-        # $0.003/1K input + $0.015/1K output
-        # Total = $0.018
-        assert cost == pytest.approx(0.018, 0.0001)
+# (model, input_tokens, output_tokens, expected USD)
+COST_CASES = [
+    # $0.03/1K input + $0.06/1K output: 0.03 + 0.03
+    pytest.param("gpt-4", 1000, 500, 0.06, id="gpt4"),
+    # $0.0005/1K input + $0.0015/1K output: 0.0005 + 0.0015
+    pytest.param("gpt-3.5-turbo", 1000, 1000, 0.002, id="gpt35"),
+    # $0.003/1K input + $0.015/1K output
+    pytest.param("claude-3-5-sonnet-20241022", 1000, 1000, 0.018, id="claude"),
+    # Unknown models cost nothing
+    pytest.param("unknown-model", 1000, 500, 0.0, id="unknown-model"),
+    pytest.param("gpt-4", 0, 0, 0.0, id="zero-tokens"),
+]
 
-    def test_calculate_unknown_model_cost(self):
-        """Should return 0 for unknown models"""
-        cost = calculate_cost("unknown-model", input_tokens=1000, output_tokens=500)
 
-        assert cost == 0.0
+class TestCostCalculation:
+    """Test LLM cost calculation"""
 
-    def test_calculate_zero_tokens(self):
-        """Should handle zero tokens"""
-        cost = calculate_cost("gpt-4", input_tokens=0, output_tokens=0)
+    @pytest.mark.parametrize("model,input_tokens,output_tokens,expected", COST_CASES)
+    def test_calculate_cost(self, model, input_tokens, output_tokens, expected):
+        """Should price tokens at the model's per-1K rates"""
+        cost = calculate_cost(model, input_tokens=input_tokens, output_tokens=output_tokens)
 
-        assert cost == 0.0
+        assert cost == pytest.approx(expected, 0.0001)
 
     def test_all_pricing_entries_valid(self):
         """All pricing entries should have required fields"""
@@ -248,11 +240,18 @@ class TestCostCalculation:
 class TestTokenEstimation:
     """Test token counting"""
 
+    @pytest.fixture(autouse=True)
+    def clear_encoding_cache(self):
+        """Encoders are memoized per model; don't let mocks leak between tests"""
+        _get_encoding.cache_clear()
+        yield
+        _get_encoding.cache_clear()
+
     @patch('prompts.cost.tiktoken.encoding_for_model')
     def test_estimate_tokens_gpt4(self, mock_encoding):
         """Should estimate tokens for GPT-4"""
         mock_enc = Mock()
-        mock_enc.encode = Mock(return_value=[1, 2, 3, 4, 5])  # 5 tokens
+        mock_enc.encode_ordinary = Mock(return_value=[1, 2, 3, 4, 5])  # 5 tokens
         mock_encoding.return_value = mock_enc
 
         count = estimate_tokens("Hello world", model="gpt-4")
@@ -260,6 +259,43 @@ class TestTokenEstimation:
         assert count == 5
         mock_encoding.assert_called_once_with("gpt-4")
 
+    @patch('prompts.cost.tiktoken.encoding_for_model')
+    def test_estimate_tokens_reuses_encoding(self, mock_encoding):
+        """Should resolve the encoding once per model"""
+        mock_enc = Mock()
+        mock_enc.encode_ordinary = Mock(return_value=[1, 2])
+        mock_encoding.return_value = mock_enc
+
+        estimate_tokens("Hello", model="gpt-4")
+        estimate_tokens("world", model="gpt-4")
+
+        mock_encoding.assert_called_once_with("gpt-4")
+        assert mock_enc.encode_ordinary.call_count == 2
+
+    @patch('prompts.cost.tiktoken.encoding_for_model')
+    def test_warm_encodings(self, mock_encoding):
+        """Should preload encodings for every OpenAI model"""
+        mock_encoding.return_value = Mock()
+        gpt_models = [m for m in PRICING if m.startswith("gpt")]
+
+        assert warm_encodings() == len(gpt_models)
+        estimate_tokens("Hello", model="gpt-4")
+
+        assert mock_encoding.call_count == len(gpt_models)
+
+    @patch('prompts.cost.tiktoken.encoding_for_model')
+    def test_estimate_tokens_batch(self, mock_encoding):
+        """Should count several texts with one batch tokenizer call"""
+        mock_enc = Mock()
+        mock_enc.encode_ordinary_batch = Mock(return_value=[[1, 2], [1, 2, 3]])
+        mock_encoding.return_value = mock_enc
+
+        assert estimate_tokens_batch(["Hello", "Hello world"], model="gpt-4") == [2, 3]
+        mock_enc.encode_ordinary_batch.assert_called_once()
+
+        # Non-OpenAI models use the rough estimate per text
+        assert estimate_tokens_batch(["A" * 8, "A" * 40], model="claude-3-haiku") == [2, 10]
+
     def test_estimate_tokens_claude(self):
         """Should estimate tokens for Claude (rough estimate)"""
         text = "A" * 100  # 100 characters
@@ -275,10 +311,24 @@ class TestTokenEstimation:
 
         assert count == 0
 
+    @patch('prompts.cost.tiktoken.get_encoding')
+    @patch('prompts.cost.tiktoken.encoding_for_model')
+    def test_estimate_tokens_unknown_model_uses_cl100k(self, mock_encoding, mock_get_encoding):
+        """Should fall back to cl100k_base for models tiktoken doesn't know"""
+        mock_encoding.side_effect = KeyError("gpt-5")
+        mock_get_encoding.return_value.encode_ordinary = Mock(return_value=[1, 2, 3])
+
+        count = estimate_tokens("Hello world", model="gpt-5")
+
+        assert count == 3
+        mock_get_encoding.assert_called_once_with("cl100k_base")
+
+    @patch('prompts.cost.tiktoken.get_encoding')
     @patch('prompts.cost.tiktoken.encoding_for_model')
-    def test_estimate_tokens_fallback(self, mock_encoding):
+    def test_estimate_tokens_fallback(self, mock_encoding, mock_get_encoding):
         """Should fallback to rough estimate on error"""
         mock_encoding.side_effect = Exception("Model not found")
+        mock_get_encoding.side_effect = Exception("Encoding unavailable")
 
         text = "A" * 100
         count = estimate_tokens(text, model="gpt-4")
@@ -357,10 +407,10 @@ class TestCostBreakdown:
 class TestCostComparison:
     """Test multi-model cost comparison"""
 
-    @patch('prompts.cost.estimate_tokens')
+    @patch('prompts.cost.estimate_tokens_batch')
     def test_compare_costs_multiple_models(self, mock_estimate):
         """Should compare costs across models"""
-        mock_estimate.return_value = 1000  # Both prompt and response = 1000 tokens
+        mock_estimate.return_value = [1000, 1000]  # Both prompt and response = 1000 tokens
 
         models = ["gpt-4", "gpt-3.5-turbo", "claude-3-haiku"]
         comparison = compare_costs("Test prompt", "Test response", models)
@@ -374,10 +424,10 @@ class TestCostComparison:
         assert comparison["gpt-4"]["total_cost"] > comparison["gpt-3.5-turbo"]["total_cost"]
         assert comparison["gpt-4"]["total_cost"] > comparison["claude-3-haiku"]["total_cost"]
 
-    @patch('prompts.cost.estimate_tokens')
+    @patch('prompts.cost.estimate_tokens_batch')
     def test_get_cheapest_model(self, mock_estimate):
         """Should identify cheapest model"""
-        mock_estimate.return_value = 1000
+        mock_estimate.return_value = [1000, 1000]
 
         models = ["gpt-4", "gpt-3.5-turbo", "claude-3-haiku"]
         comparison = compare_costs("Test", "Test", models)
@@ -413,9 +463,9 @@ class TestTemplateAndCostIntegration:
     """Test template rendering with cost estimation"""
 
     @patch('prompts.cost.estimate_tokens')
-    def test_render_template_and_estimate_cost(self, mock_estimate):
+    def test_render_template_and_estimate_cost(self, mock_estimate, code_gen_template):
         """Should render template and calculate cost"""
-        template = get_template("code_generation")
+        template = code_gen_template
         values = {"language": "Python", "task": "sort a list"}
 
         # Render template
@@ -4,11 +4,6 @@ Tests for template system
 
 import pytest
 
-# Import modules
-import sys
-from pathlib import Path
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from prompts.templates import (
     TEMPLATES,
     get_template,
@@ -35,6 +30,13 @@ def test_template_structure():
     assert isinstance(template.variables, list)
 
 
+def test_templates_are_hashable(code_gen_template):
+    """Test frozen templates can be hashed and used as keys"""
+    template = code_gen_template
+    assert {template: "seen"}[template] == "seen"
+    assert hash(template) == hash(get_template("code_generation"))
+
+
 def test_get_template():
     """Test getting template by ID"""
     template = get_template("code_generation")
@@ -43,13 +45,13 @@ def test_get_template():
 
 def test_get_template_not_found():
     """Test getting non-existent template"""
-    with pytest.raises(ValueError):
+    with pytest.raises(ValueError, match="nonexistent"):
         get_template("nonexistent")
 
 
-def test_render_template_simple():
+def test_render_template_simple(code_gen_template):
     """Test rendering a template"""
-    template = get_template("code_generation")
+    template = code_gen_template
     values = {
         "language": "Python",
         "task": "sort a list"
@@ -60,9 +62,9 @@ def test_render_template_simple():
     assert "{{" not in rendered  # No unrendered variables
 
 
-def test_render_template_missing_variable():
+def test_render_template_missing_variable(code_gen_template):
     """Test rendering with missing variables"""
-    template = get_template("code_generation")
+    template = code_gen_template
     values = {
         "language": "Python"
         # Missing 'task'
@@ -80,47 +82,141 @@ def test_get_all_categories():
     assert len(categories) > 0
 
 
-def test_all_templates_have_required_fields():
+TEMPLATE_IDS = list(TEMPLATES)
+
+
+@pytest.mark.parametrize("template_id", TEMPLATE_IDS)
+def test_all_templates_have_required_fields(template_id):
     """Test that all templates have required fields"""
-    for template_id, template in TEMPLATES.items():
-        assert template.id == template_id
-        assert template.name
-        assert template.template
-        assert template.category
-        assert isinstance(template.variables, list)
-        assert isinstance(template.example_values, dict)
+    template = TEMPLATES[template_id]
+    assert template.id == template_id
+    assert template.name
+    assert template.template
+    assert template.category
+    assert isinstance(template.variables, list)
+    assert isinstance(template.example_values, dict)
 
 
-def test_all_templates_variables_match():
+@pytest.mark.parametrize("template_id", TEMPLATE_IDS)
+def test_all_templates_variables_match(template_id):
     """Test that template variables match placeholders"""
-    for template in TEMPLATES.values():
-        # Find all {{variable}} placeholders
-        import re
-        placeholders = re.findall(r'\{\{(\w+)\}\}', template.template)
-
-        # All placeholders should be in variables list
-        for placeholder in placeholders:
-            assert placeholder in template.variables, \
-                f"Template {template.id} has placeholder {{{{{placeholder}}}}} not in variables list"
+    template = TEMPLATES[template_id]
+    # All {{variable}} placeholders should be in variables list
+    for placeholder in template._placeholders:
+        assert placeholder in template.variables_set, \
+            f"Template {template.id} has placeholder {{{{{placeholder}}}}} not in variables list"
 
 
-def test_example_values_match_variables():
+@pytest.mark.parametrize("template_id", TEMPLATE_IDS)
+def test_example_values_match_variables(template_id):
     """Test that example values match template variables"""
-    for template in TEMPLATES.values():
-        for variable in template.variables:
-            assert variable in template.example_values, \
-                f"Template {template.id} missing example value for variable '{variable}'"
+    template = TEMPLATES[template_id]
+    for variable in template.variables_set:
+        assert variable in template.example_values, \
+            f"Template {template.id} missing example value for variable '{variable}'"
 
 
-def test_render_with_example_values():
+@pytest.mark.parametrize("template_id", TEMPLATE_IDS)
+def test_render_with_example_values(template_id):
     """Test rendering all templates with their example values"""
-    for template in TEMPLATES.values():
-        try:
-            rendered = render_template(template, template.example_values)
-            assert rendered
-            assert "{{" not in rendered  # No unrendered variables
-        except Exception as e:
-            pytest.fail(f"Failed to render template {template.id} with example values: {e}")
+    template = TEMPLATES[template_id]
+    rendered = render_template(template, template.example_values)
+    assert rendered
+    assert "{{" not in rendered  # No unrendered variables
+    assert template.example_rendered == rendered
+
+
+def test_render_keeps_literal_braces():
+    """Test braces outside declared placeholders, and in values, render as-is"""
+    template = PromptTemplate(
+        id="json_reply",
+        name="JSON Reply",
+        description="Reply as JSON",
+        template='Answer {{question}} as {"answer": ...} ({{undeclared}})',
+        variables=["question"],
+        system_prompt="",
+        category="testing",
+        example_values={"question": "why"},
+    )
+
+    rendered = render_template(template, {"question": "{{question}} {x}"})
+    assert rendered == 'Answer {{question}} {x} as {"answer": ...} ({{undeclared}})'
+
+
+def test_template_placeholders(code_gen_template):
+    """Test placeholders are collected once, including undeclared ones"""
+    template = code_gen_template
+    assert template._placeholders == {"language", "task"}
+
+    template = PromptTemplate(
+        id="partial",
+        name="Partial",
+        description="Partially declared",
+        template="{{a}} {{b}} {a} {{a}}",
+        variables=["a"],
+        system_prompt="",
+        category="testing",
+        example_values={"a": "x"},
+    )
+    assert template._placeholders == {"a", "b"}
+    assert template._placeholders - template.variables_set == {"b"}
+
+
+def test_render_template_memoized(code_gen_template):
+    """Test repeat renders are memoized and unhashable values still render"""
+    from prompts.templates import _render_compiled
+
+    template = code_gen_template
+    _render_compiled.cache_clear()
+
+    first = render_template(template, template.example_values)
+    assert render_template(template, dict(template.example_values)) == first
+    assert _render_compiled.cache_info().hits == 1
+
+    rendered = render_template(template, {"language": ["Python"], "task": "sort"})
+    assert "['Python']" in rendered
+    assert _render_compiled.cache_info().currsize == 1
+
+
+def test_validate_library_reports_every_problem():
+    """Test the import-time library check names each broken invariant"""
+    from prompts.templates import _validate_library
+
+    template = PromptTemplate(
+        id="broken",
+        name="Broken",
+        description="Inconsistent",
+        template="{{a}} {{b}}",
+        variables=["a"],
+        system_prompt="",
+        category="testing",
+        example_values={},
+    )
+
+    with pytest.raises(ValueError) as excinfo:
+        _validate_library({"renamed": template})
+
+    message = str(excinfo.value)
+    assert "different id" in message
+    assert "{{b}} not in variables" in message
+    assert "no example value for a" in message
+
+    _validate_library(TEMPLATES)
+
+
+def test_template_rejects_invalid_variable_names():
+    """Test variables are validated once, when the template is built"""
+    with pytest.raises(ValueError, match="user.name"):
+        PromptTemplate(
+            id="greeting",
+            name="Greeting",
+            description="Greet a user",
+            template="Hello {{user.name}}",
+            variables=["user.name"],
+            system_prompt="",
+            category="testing",
+            example_values={},
+        )
 
 
 if __name__ == "__main__":